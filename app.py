@@ -1,10 +1,20 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
-from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
 import gc
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from matrica import loaders, pipeline
+from matrica.export import BACKENDS, matrix_tiles
+from matrica.cache import ParseCache, file_sha256
+from matrica.jobs import FAILED, JobRunner
+from matrica.metrics import stage_totals
+
+# Seconds between reruns while a background job is running
+POLL_SECONDS = 0.5
 
 st.set_page_config(
     page_title="Kupac-Artikl Matrica",
@@ -13,237 +23,304 @@ st.set_page_config(
 )
 
 st.title("📊 Kupac-Artikl Matrica Generator")
-st.markdown("Upload Excel datoteku i generiraj True/False matricu kupac × artikl")
+st.markdown("Upload Excel, CSV ili Parquet datoteku i generiraj True/False matricu kupac × artikl")
 
 
 @st.cache_data(max_entries=1, show_spinner=False)
-def load_excel(file):
-    """Load only required columns with optimized dtypes."""
-    df = pd.read_excel(file)
-    return df
+def load_preview(file, engine):
+    """Read only the header row and a small sample for column selection."""
+    return loaders.load_preview(file, engine)
 
 
-def process_data(df, kupac_col, artikl_col):
-    """
-    Process data using set operations - minimal memory footprint.
-    Returns only what's needed for stats and Excel generation.
-    """
-    # Drop rows with NaN in key columns
-    df_clean = df[[kupac_col, artikl_col]].dropna()
-
-    # Convert to string to avoid type comparison issues
-    kupac_values = df_clean[kupac_col].astype(str)
-    artikl_values = df_clean[artikl_col].astype(str)
-
-    # Get unique pairs as frozen set for O(1) lookup
-    pair_set = set(zip(kupac_values, artikl_values))
-
-    # Get sorted unique values
-    kupci = sorted(kupac_values.unique())
-    artikli = sorted(artikl_values.unique())
-
-    # Count per kupac/artikl using dict (faster than pandas for this)
-    kupac_counts = {}
-    artikl_counts = {}
-    for kupac, artikl in pair_set:
-        kupac_counts[kupac] = kupac_counts.get(kupac, 0) + 1
-        artikl_counts[artikl] = artikl_counts.get(artikl, 0) + 1
-
-    return {
-        'pair_set': pair_set,
-        'kupci': kupci,
-        'artikli': artikli,
-        'kupac_counts': kupac_counts,
-        'artikl_counts': artikl_counts,
-        'num_kupaca': len(kupci),
-        'num_artikala': len(artikli),
-        'true_count': len(pair_set)
-    }
-
-
-def generate_excel_streaming(data, kupac_col, artikl_col, df_len, progress_callback=None):
+@st.cache_resource
+def get_parse_cache():
+    """Disk cache of parsed uploads, shared by all sessions."""
+    return ParseCache()
+
+
+@st.cache_resource
+def get_results_dir():
+    """Directory holding finished job outputs; removed when the server exits."""
+    return tempfile.TemporaryDirectory(prefix='matrica-jobs-')
+
+
+def discard_result(job):
+    """Delete the output file of a job dropped from the JobRunner history."""
+    if job.result is not None:
+        try:
+            os.remove(job.result['path'])
+        except FileNotFoundError:
+            pass
+
+
+@st.cache_resource
+def get_job_runner():
+    """Background generation jobs, shared by all sessions so they survive reruns and reloads."""
+    return JobRunner(on_discard=discard_result)
+
+
+def run_job(upload, file_name, kupac_col, artikl_col, output_format, engine, streaming,
+            parse_cache, file_hash, backend, workers, with_counts, trace_memory,
+            metrics_in_summary, results_dir, progress_callback):
     """
-    Generate Excel by streaming rows directly to openpyxl.
-    Never holds full matrix in memory.
+    Job body: the whole pipeline on a private copy of the upload. The output
+    is kept as a file in results_dir, not in memory, until the job is pruned.
     """
-    pair_set = data['pair_set']
-    kupci = data['kupci']
-    artikli = data['artikli']
-    kupac_counts = data['kupac_counts']
-    artikl_counts = data['artikl_counts']
-    num_kupaca = data['num_kupaca']
-    num_artikala = data['num_artikala']
-    true_count = data['true_count']
-    total_celija = num_kupaca * num_artikala
-
-    # Create workbook
-    wb = Workbook(write_only=False)  # write_only=True has issues with multiple sheets
-
-    # === Sheet 1: Summary ===
-    ws_summary = wb.active
-    ws_summary.title = "Summary"
-
-    summary_rows = [
-        ["Metrika", "Vrijednost"],
-        ["Datum generiranja", datetime.now().strftime('%Y-%m-%d %H:%M')],
-        ["Ukupno redaka u izvoru", f"{df_len:,}"],
-        ["Broj unikatnih kupaca", f"{num_kupaca:,}"],
-        ["Broj unikatnih artikala", f"{num_artikala:,}"],
-        ["Veličina matrice", f"{num_kupaca:,} x {num_artikala:,}"],
-        ["Ukupno ćelija", f"{total_celija:,}"],
-        ["TRUE vrijednosti", f"{true_count:,}"],
-        ["FALSE vrijednosti", f"{total_celija - true_count:,}"],
-        ["% popunjenosti", f"{100*true_count/total_celija:.2f}%"],
-        ["Prosjek artikala po kupcu", f"{sum(kupac_counts.values())/len(kupac_counts):.1f}"],
-        ["Prosjek kupaca po artiklu", f"{sum(artikl_counts.values())/len(artikl_counts):.1f}"],
-    ]
-    for row in summary_rows:
-        ws_summary.append(row)
-
-    # Top 10 kupaca
-    ws_summary.append([])
-    ws_summary.append(["TOP 10 KUPACA", "", "", "TOP 10 ARTIKALA"])
-    ws_summary.append(["Kupac", "Broj artikala", "", "Artikl", "Broj kupaca"])
-
-    top_kupci = sorted(kupac_counts.items(), key=lambda x: -x[1])[:10]
-    top_artikli = sorted(artikl_counts.items(), key=lambda x: -x[1])[:10]
-
-    for i in range(10):
-        row = []
-        if i < len(top_kupci):
-            row.extend([top_kupci[i][0], top_kupci[i][1], ""])
-        else:
-            row.extend(["", "", ""])
-        if i < len(top_artikli):
-            row.extend([top_artikli[i][0], top_artikli[i][1]])
-        ws_summary.append(row)
-
-    # === Sheet 2: Matrica (streaming) ===
-    ws_matrix = wb.create_sheet("Matrica")
-
-    # Header row
-    ws_matrix.append([kupac_col] + artikli)
-
-    # Stream data rows - one at a time, never hold in memory
-    for idx, kupac in enumerate(kupci):
-        # Build row on-the-fly using generator
-        row = [kupac] + [kupac_artikl in pair_set for kupac_artikl in ((kupac, a) for a in artikli)]
-        ws_matrix.append(row)
-
-        # Update progress every 100 rows
-        if progress_callback and idx % 100 == 0:
-            progress_callback(40 + int(50 * idx / num_kupaca))
-
-        # Garbage collect every 500 rows
-        if idx % 500 == 0:
-            gc.collect()
-
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    # Cleanup
-    wb.close()
-    del wb
+    file = io.BytesIO(upload)
+    file.name = file_name
+    result = pipeline.run(
+        file, kupac_col, artikl_col, output_format, engine, streaming, parse_cache, file_hash,
+        backend, workers, with_counts, progress_callback, trace_memory, metrics_in_summary,
+    )
+    fd, path = tempfile.mkstemp(dir=results_dir)
+    try:
+        with result.pop('output') as output, os.fdopen(fd, 'wb') as fh:
+            shutil.copyfileobj(output, fh)
+    except BaseException:
+        os.remove(path)
+        raise
+    result.update(path=path, output_format=output_format)
     gc.collect()
-
-    return output, top_kupci, top_artikli
+    return result
 
 
-# File upload
-uploaded_file = st.file_uploader("Odaberi Excel datoteku", type=['xlsx', 'xls'])
+def attach_job(job_id):
+    """Show job_id in this session and keep it in the URL so a reload reconnects."""
+    st.session_state.job_id = job_id
+    st.query_params['job'] = job_id
 
-if uploaded_file is not None:
-    with st.spinner("Učitavam datoteku..."):
-        df = load_excel(uploaded_file)
 
-    st.success(f"Učitano {len(df):,} redaka")
+def attached_job_id():
+    return st.session_state.get('job_id') or st.query_params.get('job')
 
-    mem_usage = df.memory_usage(deep=True).sum() / 1024 / 1024
-    st.caption(f"Memorija učitane datoteke: {mem_usage:.1f} MB")
 
-    st.subheader("1. Odaberi stupce")
-    col1, col2 = st.columns(2)
+def upload_hash(file):
+    """SHA-256 of the upload, computed once per uploaded file rather than every rerun."""
+    upload_id = getattr(file, 'file_id', None) or (file.name, file.size)
+    if st.session_state.get('upload_id') != upload_id:
+        st.session_state.upload_hash = file_sha256(file)
+        st.session_state.upload_id = upload_id
+    return st.session_state.upload_hash
 
-    with col1:
-        kupac_col = st.selectbox("Stupac s kupcima:", options=df.columns, index=0)
 
-    with col2:
-        artikl_col = st.selectbox("Stupac s artiklima:", options=df.columns, index=min(2, len(df.columns)-1))
+def show_job(job, current_key=None):
+    """Progress of a running job (polled by rerunning) or its result."""
+    st.caption(f"Posao `{job.id}`: {job.label}")
+    if job.status == FAILED:
+        st.error(f"Generiranje nije uspjelo: {job.error}")
+        return
+    if not job.done:
+        st.progress(job.progress, text=job.message)
+        time.sleep(POLL_SECONDS)
+        st.rerun()
 
-    with st.expander("Pregled podataka (prvih 100 redaka)"):
-        st.dataframe(df.head(100))
+    if current_key is not None and job.key != current_key:
+        st.caption("Prikazan je rezultat za ranije postavke - klikni Generiraj za nove.")
+    show_result(job.result, job.label)
 
-    if st.button("🚀 Generiraj matricu", type="primary"):
-        progress_bar = st.progress(0, text="Početak...")
 
-        # Step 1: Process data
-        progress_bar.progress(10, text="Analiziram podatke...")
-        data = process_data(df, kupac_col, artikl_col)
+def show_result(result, label):
+    """Metrics, top 10 tables and download button of a finished export."""
+    num_kupaca = result['num_kupaca']
+    num_artikala = result['num_artikala']
+    true_count = result['true_count']
+    total_celija = num_kupaca * num_artikala
 
-        num_kupaca = data['num_kupaca']
-        num_artikala = data['num_artikala']
-        true_count = data['true_count']
-        total_celija = num_kupaca * num_artikala
+    load_info = result['load_info']
+    if load_info['source'] == 'streaming':
+        st.caption(f"Učitano {result['num_rows']:,} redaka (streaming)")
+    else:
+        source = " (iz cachea)" if load_info['source'] == 'cache' else ""
+        st.caption(
+            f"Učitano {result['num_rows']:,} redaka{source}, memorija: {load_info['memory_mb']:.1f} MB"
+        )
 
-        progress_bar.progress(20, text=f"Generiram Excel ({num_kupaca:,} redaka)...")
+    st.subheader("2. Rezultati")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Kupaca", f"{num_kupaca:,}")
+    col2.metric("Artikala", f"{num_artikala:,}")
+    col3.metric("TRUE", f"{true_count:,}")
+    col4.metric("Popunjenost", f"{100*true_count/total_celija:.2f}%")
+
+    num_tiles = len(matrix_tiles(num_kupaca, num_artikala))
+    if result['output_format'] == 'xlsx' and num_tiles > 1:
+        st.info(
+            f"Matrica prelazi Excel limit (1,048,576 redaka × 16,384 stupaca) i "
+            f"podijeljena je na {num_tiles} listova Matrica_1..{num_tiles} - raspored je u Summary listu"
+        )
 
-        # Step 2: Generate Excel streaming
-        def update_progress(pct):
-            progress_bar.progress(pct, text=f"Zapisujem matricu... {pct}%")
+    with st.expander("⏱️ Mjerenja po fazama"):
+        stages = pd.DataFrame(result['stages'] + [stage_totals(result['stages'])])
+        st.dataframe(
+            stages.rename(columns={
+                'stage': "Faza", 'wall_s': "Vrijeme (s)", 'cpu_s': "CPU (s)",
+                'peak_rss_mb': "Vršni RSS (MB)", 'py_peak_mb': "Python vrh (MB)",
+            }),
+            hide_index=True
+        )
 
-        output, top_kupci, top_artikli = generate_excel_streaming(
-            data, kupac_col, artikl_col, len(df), update_progress
+    st.subheader("3. Top 10")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Top 10 kupaca** (po broju artikala)")
+        st.dataframe(
+            pd.DataFrame(result['top_kupci'], columns=['Kupac', 'Broj artikala']),
+            hide_index=True
+        )
+    with col2:
+        st.markdown("**Top 10 artikala** (po broju kupaca)")
+        st.dataframe(
+            pd.DataFrame(result['top_artikli'], columns=['Artikl', 'Broj kupaca']),
+            hide_index=True
         )
 
-        progress_bar.progress(100, text="Gotovo!")
-
-        # Cleanup
-        del data
-        gc.collect()
-
-        # Results
-        st.subheader("2. Rezultati")
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Kupaca", f"{num_kupaca:,}")
-        col2.metric("Artikala", f"{num_artikala:,}")
-        col3.metric("TRUE", f"{true_count:,}")
-        col4.metric("Popunjenost", f"{100*true_count/total_celija:.2f}%")
-
-        st.subheader("3. Top 10")
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("**Top 10 kupaca** (po broju artikala)")
-            st.dataframe(
-                pd.DataFrame(top_kupci, columns=['Kupac', 'Broj artikala']),
-                hide_index=True
+    st.subheader("4. Preuzmi")
+    file_name, mime = pipeline.output_file_info(result['output_format'])
+    # Read from disk only while the download button is shown
+    try:
+        with open(result['path'], 'rb') as fh:
+            st.download_button(
+                label=f"📥 Preuzmi {label}",
+                data=fh,
+                file_name=file_name,
+                mime=mime
             )
-        with col2:
-            st.markdown("**Top 10 artikala** (po broju kupaca)")
-            st.dataframe(
-                pd.DataFrame(top_artikli, columns=['Artikl', 'Broj kupaca']),
-                hide_index=True
-            )
-
-        st.subheader("4. Preuzmi")
-        st.download_button(
-            label="📥 Preuzmi Excel (Summary + Matrica)",
-            data=output.getvalue(),
-            file_name="kupac_artikl_matrix.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    except FileNotFoundError:
+        st.warning("Datoteka ovog posla više nije dostupna - generiraj ponovno")
+
+
+# Output choices: label -> pipeline output format
+EXPORT_MODES = {
+    "Matrica (xlsx)": 'xlsx',
+    "Matrica (parquet)": 'parquet',
+    "Matrica (feather / Arrow IPC)": 'feather',
+    "Parovi kupac-artikl (csv)": 'pairs-csv',
+    "Parovi kupac-artikl (parquet)": 'pairs-parquet',
+    "Parovi kupac-artikl (xlsx)": 'pairs-xlsx',
+    "Rijetka matrica (scipy .npz)": 'npz',
+    "Rijetka matrica (MatrixMarket .mtx)": 'mtx',
+}
+EXPORT_MODES = {label: fmt for label, fmt in EXPORT_MODES.items() if fmt in pipeline.OUTPUT_FORMATS}
+
+# Settings
+with st.sidebar:
+    st.header("⚙️ Postavke")
+    engine = st.selectbox(
+        "Excel čitač:",
+        options=['auto'] + loaders.available_engines(),
+        help="auto koristi calamine ako je instaliran, inače openpyxl/xlrd",
+    )
+    streaming = st.checkbox(
+        "Streaming učitavanje (manje memorije)",
+        help="Čita datoteku red po red bez DataFrame-a; memorija ovisi samo o broju unikatnih parova (nije podržano za xls)",
+    )
+    export_mode = st.radio(
+        "Izvoz:",
+        options=list(EXPORT_MODES),
+        help="Parovi sadrže samo TRUE kombinacije (kupac, artikl) i generiraju se u sekundama",
+    )
+    with_counts = st.checkbox(
+        "S brojem kupnji (parovi / rijetka matrica)",
+        help="Umjesto TRUE zapisuje broj redaka izvora po paru",
+    )
+    backend = st.selectbox(
+        "Excel zapis matrice:",
+        options=BACKENDS,
+        help="xml piše list Matrica izravno kao XML (najbrže), openpyxl red po red kroz openpyxl, "
+             "xlsxwriter u constant_memory načinu",
+    )
+    workers = st.number_input(
+        "Paralelni procesi (xml):",
+        min_value=1, max_value=os.cpu_count() or 1, value=1,
+        help="Više od 1 generira listove Matrica_1..N paralelno (samo xml backend)",
+    )
+    with st.expander("Mjerenja"):
+        trace_memory = st.checkbox(
+            "Vrh Python memorije (tracemalloc)",
+            help="Mjeri vrh Python alokacija po fazi; znatno usporava učitavanje",
+        )
+        metrics_in_summary = st.checkbox(
+            "Mjerenja u Summary listu (xlsx)",
+            help="Summary se piše prije matrice, pa sadrži faze do početka izvoza",
         )
+    parse_cache = get_parse_cache()
+    st.caption(f"Cache učitanih datoteka: {parse_cache.size() / 1024 / 1024:.1f} MB")
+    if st.button("Očisti cache"):
+        parse_cache.clear()
+    st.text_input(
+        "Poveži se na posao (ID):",
+        key='job_id_input',
+        on_change=lambda: attach_job(st.session_state.job_id_input.strip()),
+        help="Generiranje radi u pozadini; ID posla je prikazan uz rezultat i u adresi stranice",
+    )
+
+job_runner = get_job_runner()
+result_key = None
+
+# File upload
+uploaded_file = st.file_uploader("Odaberi datoteku", type=loaders.UPLOAD_TYPES)
+
+if uploaded_file is not None:
+    with st.spinner("Učitavam zaglavlje..."):
+        preview = load_preview(uploaded_file, engine)
+
+    st.success(f"Pronađeno {len(preview.columns):,} stupaca")
+
+    st.subheader("1. Odaberi stupce")
+    col1, col2 = st.columns(2)
+
+    with col1:
+        kupac_col = st.selectbox("Stupac s kupcima:", options=preview.columns, index=0)
+
+    with col2:
+        artikl_col = st.selectbox("Stupac s artiklima:", options=preview.columns, index=min(2, len(preview.columns)-1))
+
+    with st.expander(f"Pregled podataka (prvih {loaders.PREVIEW_ROWS} redaka)"):
+        st.dataframe(preview)
+
+    # Everything that changes the generated file, including the resolved
+    # Excel engine and streaming: readers stringify cells differently.
+    # workers only change how it is produced
+    output_format = EXPORT_MODES[export_mode]
+    is_excel = loaders.detect_format(uploaded_file) == 'excel'
+    result_key = (
+        upload_hash(uploaded_file), kupac_col, artikl_col, output_format,
+        loaders.select_engine(uploaded_file, engine) if is_excel else None, streaming,
+        backend if output_format == 'xlsx' else None, with_counts,
+        metrics_in_summary and output_format == 'xlsx',
+    )
+
+    # Generation runs in the background; a running or finished job for the
+    # same input is reused instead of starting again
+    if st.button("🚀 Generiraj matricu", type="primary"):
+        job = job_runner.find(result_key)
+        if job is None:
+            job = job_runner.submit(
+                run_job, uploaded_file.getvalue(), uploaded_file.name, kupac_col, artikl_col,
+                output_format, engine, streaming, parse_cache, result_key[0], backend, workers,
+                with_counts, trace_memory, metrics_in_summary, get_results_dir().name,
+                key=result_key, label=export_mode,
+            )
+        attach_job(job.id)
 
-else:
-    st.info("👆 Upload Excel datoteku za početak")
+elif attached_job_id() is None:
+    st.info("👆 Upload datoteku za početak")
     st.markdown("""
     ### Očekivani format:
-    Excel s stupcima za **Kupca** i **Artikl**
+    Excel (xlsx/xls), CSV/TSV ili Parquet s stupcima za **Kupca** i **Artikl**
 
     ### Optimizacije v3:
-    - ✅ Set-based lookup (O(1) provjera)
+    - ✅ Kupci/artikli kao int32 kodovi, parovi kao int64 ključevi
     - ✅ Streaming zapis u Excel (red po red)
     - ✅ Nikad puna matrica u memoriji
-    - ✅ Dict umjesto pandas za statistike
+    - ✅ Brojanje preko np.bincount
     - ✅ GC svaki 500 redaka
     """)
+
+job_id = attached_job_id()
+if job_id:
+    job = job_runner.get(job_id)
+    if job is None:
+        st.warning(f"Posao {job_id} ne postoji (završen prije previše vremena ili je server ponovno pokrenut)")
+    else:
+        show_job(job, result_key)
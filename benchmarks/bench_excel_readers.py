@@ -0,0 +1,75 @@
+"""
+Compare Excel reader engines used by matrica.load_excel.
+
+Each (file, engine) run happens in a fresh process so peak RSS is not
+polluted by earlier runs. Without arguments a synthetic xlsx is generated;
+pass your own .xlsx/.xls exports to benchmark real data.
+
+    python benchmarks/bench_excel_readers.py [--rows N] [--kupac COL --artikl COL] [FILE ...]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from common import peak_rss_mb, run_isolated
+
+from matrica.loaders import DEFAULT_ENGINES, HAS_CALAMINE, file_extension, load_excel  # noqa: E402
+
+
+def make_xlsx(path, rows):
+    """Write a synthetic purchase log with a few extra columns."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'Datum': pd.date_range('2024-01-01', periods=rows, freq='min'),
+        'Kupac': [f"K{i:05d}" for i in rng.integers(0, max(rows // 50, 1), rows)],
+        'Artikl': rng.integers(100000, 100000 + max(rows // 20, 1), rows),
+        'Kolicina': rng.integers(1, 10, rows),
+        'Cijena': rng.random(rows) * 100,
+    })
+    df.to_excel(path, index=False)
+
+
+def _run(path, kupac_col, artikl_col, engine):
+    start = time.perf_counter()
+    df = load_excel(path, kupac_col, artikl_col, engine)
+    elapsed = time.perf_counter() - start
+    return len(df), elapsed, peak_rss_mb()
+
+
+def engines_for(path):
+    engines = ['calamine'] if HAS_CALAMINE else []
+    fallback = DEFAULT_ENGINES.get(file_extension(path))
+    return engines + ([fallback] if fallback else [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--kupac', default='Kupac')
+    parser.add_argument('--artikl', default='Artikl')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.files
+        if not files:
+            path = os.path.join(tmp, 'synthetic.xlsx')
+            print(f"Generating {args.rows:,} row synthetic xlsx...", file=sys.stderr)
+            make_xlsx(path, args.rows)
+            files = [path]
+
+        print(f"{'file':<30} {'engine':<10} {'rows':>10} {'time s':>9} {'peak RSS MB':>12}")
+        for path in files:
+            for engine in engines_for(path):
+                rows, elapsed, peak = run_isolated(_run, path, args.kupac, args.artikl, engine)
+                name = os.path.basename(path)
+                print(f"{name:<30} {engine:<10} {rows:>10,} {elapsed:>9.2f} {peak:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
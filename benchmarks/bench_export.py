@@ -0,0 +1,69 @@
+"""
+Compare Excel export backends of matrica.generate_excel_streaming.
+
+For each matrix size a synthetic purchase log is generated and reduced
+with process_data inside a fresh process; only the export is timed.
+Reported peak RSS growth is measured from the end of data preparation.
+
+    python benchmarks/bench_export.py [--kupci 1000,10000,50000] [--artikli N] [--backends xml,openpyxl]
+"""
+import argparse
+import sys
+import time
+
+from common import peak_rss_mb, run_isolated
+
+from matrica.export import BACKENDS, generate_excel_streaming
+
+
+def make_data(num_kupaca, num_artikala, per_kupac, seed=0):
+    """process_data result for a random log with ~per_kupac artikli per kupac."""
+    import numpy as np
+    import pandas as pd
+
+    from matrica import process_data
+
+    rng = np.random.default_rng(seed)
+    rows = num_kupaca * per_kupac
+    df = pd.DataFrame({
+        'Kupac': pd.Categorical([f"K{i:06d}" for i in rng.integers(0, num_kupaca, rows)]),
+        'Artikl': pd.Categorical([f"A{i:06d}" for i in rng.integers(0, num_artikala, rows)]),
+    })
+    return process_data(df, 'Kupac', 'Artikl')
+
+
+def _run(backend, num_kupaca, num_artikala, per_kupac):
+    data = make_data(num_kupaca, num_artikala, per_kupac)
+    base = peak_rss_mb()
+    start = time.perf_counter()
+    output, _, _ = generate_excel_streaming(data, 'Kupac', 'Artikl', data['num_rows'], backend=backend)
+    elapsed = time.perf_counter() - start
+    size = output.seek(0, 2)
+    output.close()
+    return elapsed, peak_rss_mb() - base, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--kupci', default='1000,10000,50000',
+                        help="comma separated kupac counts")
+    parser.add_argument('--artikli', type=int, default=1000)
+    parser.add_argument('--per-kupac', type=int, default=30,
+                        help="average source rows per kupac")
+    parser.add_argument('--backends', default=','.join(BACKENDS))
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.kupci.split(',')]
+    backends = args.backends.split(',')
+
+    print(f"{'kupci':>8} {'artikli':>8} {'backend':<11} {'time s':>9} {'RSS +MB':>9} {'file MB':>9}")
+    for num_kupaca in sizes:
+        for backend in backends:
+            print(f"running {backend} for {num_kupaca:,} kupci...", file=sys.stderr)
+            elapsed, rss, size = run_isolated(_run, backend, num_kupaca, args.artikli, args.per_kupac)
+            print(f"{num_kupaca:>8,} {args.artikli:>8,} {backend:<11} {elapsed:>9.2f} "
+                  f"{rss:>9.1f} {size / 1024 / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Benchmark suite: time and peak memory per pipeline stage across input
+formats, Excel engines and output formats, compared with a baseline.
+
+Every case runs in a fresh process on a synthetic Zipf purchase log (see
+synthetic.py) and records matrica.metrics stages. parse:* cases time
+pipeline.load from a file; export:* cases build the process_data result
+from an in-memory frame and time pipeline.export. Peak RSS is the child
+process high-water mark, so for export:* it includes the input frame.
+
+    python benchmarks/bench_suite.py                       # small profile vs baseline.json
+    python benchmarks/bench_suite.py --profile medium --cases 'export:*'
+    python benchmarks/bench_suite.py --save                # rewrite the baseline
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from common import REPO_ROOT, peak_rss_mb, run_isolated
+
+from matrica import pipeline  # noqa: E402
+from matrica.export import BACKENDS, MAX_EXCEL_ROWS  # noqa: E402
+from matrica.loaders import DEFAULT_ENGINES, HAS_CALAMINE  # noqa: E402
+
+BASELINE_PATH = os.path.join(REPO_ROOT, 'benchmarks', 'baseline.json')
+
+# rows, kupci, artikli of the synthetic log
+PROFILES = {
+    'small': (200_000, 5_000, 2_000),
+    'medium': (2_000_000, 20_000, 5_000),
+    'large': (50_000_000, 100_000, 50_000),
+}
+# Dense outputs (xlsx / parquet / feather matrix) are skipped above this many cells
+MAX_DENSE_CELLS = 200_000_000
+# Total wall time ratio against the baseline reported as a regression, if
+# the case is also at least MIN_REGRESSION_S slower (tiny cases are noisy)
+REGRESSION_RATIO = 1.25
+MIN_REGRESSION_S = 0.05
+DENSE_FORMATS = ('xlsx', 'parquet', 'feather')
+# Row-by-row xlsx backends are far slower; opt in with --cases
+DEFAULT_CASES = ('parse:*', 'export:xlsx:xml', 'export:parquet', 'export:feather',
+                 'export:pairs-*', 'export:npz', 'export:mtx')
+
+
+def build_cases(rows, num_kupaca, num_artikala):
+    """{case name: (kind, option)} for a profile; xlsx input only below the sheet limit."""
+    cases = {
+        'parse:parquet': ('parse', ('.parquet', None, False)),
+        'parse:csv': ('parse', ('.csv', None, False)),
+        'parse:csv:streaming': ('parse', ('.csv', None, True)),
+    }
+    if rows < MAX_EXCEL_ROWS:
+        engines = (['calamine'] if HAS_CALAMINE else []) + [DEFAULT_ENGINES['.xlsx']]
+        for engine in engines:
+            cases[f'parse:xlsx:{engine}'] = ('parse', ('.xlsx', engine, False))
+
+    dense_ok = num_kupaca * num_artikala <= MAX_DENSE_CELLS
+    for output_format, (kind, fmt) in pipeline.OUTPUT_FORMATS.items():
+        if fmt in DENSE_FORMATS and kind == 'matrix' and not dense_ok:
+            continue
+        if output_format == 'xlsx':
+            for backend in BACKENDS:
+                cases[f'export:xlsx:{backend}'] = ('export', ('xlsx', backend))
+        else:
+            cases[f'export:{output_format}'] = ('export', (output_format, 'xml'))
+    return cases
+
+
+def _run_case(kind, option, data_dir, rows, num_kupaca, num_artikala):
+    from matrica.metrics import StageRecorder
+
+    if kind == 'parse':
+        extension, engine, streaming = option
+        path = os.path.join(data_dir, f'log{extension}')
+        with StageRecorder() as recorder:
+            pipeline.load(path, 'Kupac', 'Artikl', engine, streaming)
+    else:
+        from synthetic import make_frame
+
+        from matrica import process_data
+
+        output_format, backend = option
+        df = make_frame(rows, num_kupaca, num_artikala)
+        with StageRecorder() as recorder:
+            data = process_data(df, 'Kupac', 'Artikl')
+            del df
+            output, _, _ = pipeline.export(data, 'Kupac', 'Artikl', output_format, backend)
+            output.close()
+    return recorder.stages, peak_rss_mb()
+
+
+def run_case(kind, option, data_dir, size, repeat):
+    """Best (lowest total wall time) of repeat isolated runs, as a result entry."""
+    best = None
+    for _ in range(repeat):
+        stages, peak = run_isolated(_run_case, kind, option, data_dir, *size)
+        wall = sum(record['wall_s'] for record in stages)
+        if best is None or wall < best['wall_s']:
+            best = {
+                'wall_s': round(wall, 4),
+                'peak_rss_mb': round(peak, 1),
+                'stages': {},
+            }
+            for record in stages:
+                entry = best['stages'].setdefault(record['stage'], {'wall_s': 0.0, 'cpu_s': 0.0})
+                entry['wall_s'] = round(entry['wall_s'] + record['wall_s'], 4)
+                entry['cpu_s'] = round(entry['cpu_s'] + record['cpu_s'], 4)
+    return best
+
+
+def machine_info():
+    import numpy
+    import pandas
+    import pyarrow
+
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'pyarrow': pyarrow.__version__,
+    }
+
+
+def prepare_inputs(data_dir, cases, size):
+    from synthetic import write_log
+
+    extensions = sorted({option[0] for kind, option in cases.values() if kind == 'parse'})
+    for extension in extensions:
+        path = os.path.join(data_dir, f'log{extension}')
+        if not os.path.exists(path):
+            print(f"Generating {path} ({size[0]:,} rows)...", file=sys.stderr)
+            write_log(path, *size)
+
+
+def compare(results, baseline, threshold):
+    """Print current vs baseline totals; returns names of regressed cases."""
+    regressions = []
+    print(f"\n{'case':<28} {'time s':>9} {'base s':>9} {'ratio':>7} {'RSS MB':>9} {'base MB':>9}")
+    for name, result in results['cases'].items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            print(f"{name:<28} {result['wall_s']:>9.3f} {'-':>9} {'-':>7} {result['peak_rss_mb']:>9.1f} {'-':>9}")
+            continue
+        ratio = result['wall_s'] / base['wall_s'] if base['wall_s'] else float('inf')
+        slower = ratio > threshold and result['wall_s'] - base['wall_s'] >= MIN_REGRESSION_S
+        flag = "  SLOWER" if slower else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<28} {result['wall_s']:>9.3f} {base['wall_s']:>9.3f} {ratio:>7.2f} "
+              f"{result['peak_rss_mb']:>9.1f} {base['peak_rss_mb']:>9.1f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', default='small', choices=list(PROFILES))
+    parser.add_argument('--cases', default=','.join(DEFAULT_CASES),
+                        help="comma separated case names or glob patterns ('all' for every case)")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per case, best is kept")
+    parser.add_argument('--data-dir', help="keep generated inputs here between runs")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help="write the results as the baseline")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_RATIO)
+    parser.add_argument('--strict', action='store_true', help="exit 1 on a regression")
+    args = parser.parse_args(argv)
+
+    size = PROFILES[args.profile]
+    all_cases = build_cases(*size)
+    patterns = args.cases.split(',')
+    cases = {
+        name: case for name, case in all_cases.items()
+        if 'all' in patterns or any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+    }
+
+    results = {
+        'profile': args.profile,
+        'rows': size[0], 'kupci': size[1], 'artikli': size[2],
+        'machine': machine_info(),
+        'cases': {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(args.data_dir, args.profile) if args.data_dir else tmp
+        os.makedirs(data_dir, exist_ok=True)
+        prepare_inputs(data_dir, cases, size)
+
+        print(f"{'case':<28} {'time s':>9} {'RSS MB':>9}  stages (s)")
+        for name, (kind, option) in cases.items():
+            started = time.perf_counter()
+            result = results['cases'][name] = run_case(kind, option, data_dir, size, args.repeat)
+            stages = ", ".join(f"{stage} {entry['wall_s']:.2f}" for stage, entry in result['stages'].items())
+            print(f"{name:<28} {result['wall_s']:>9.3f} {result['peak_rss_mb']:>9.1f}  {stages}")
+            print(f"  ({time.perf_counter() - started:.1f}s incl. process start)", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.save:
+        with open(args.baseline, 'w') as fh:
+            json.dump(results, fh, indent=2)
+            fh.write('\n')
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    if baseline.get('profile') != args.profile:
+        print(f"\nBaseline is for profile {baseline.get('profile')}, not compared", file=sys.stderr)
+        return 0
+    if baseline.get('machine') != results['machine']:
+        print("\nNote: baseline was recorded on a different machine/library versions", file=sys.stderr)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than {args.threshold}x baseline: {', '.join(regressions)}")
+    return 1 if regressions and args.strict else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
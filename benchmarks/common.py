@@ -0,0 +1,28 @@
+"""Helpers shared by the benchmark scripts."""
+import multiprocessing as mp
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from matrica.metrics import peak_rss_mb  # noqa: E402
+
+
+def _child(target, args, queue):
+    queue.put(target(*args))
+
+
+def run_isolated(target, *args):
+    """
+    Run target(*args) in a fresh spawned process and return its result,
+    so peak RSS measured inside target is not inflated by earlier runs.
+    """
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(target, args, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
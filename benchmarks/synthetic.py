@@ -0,0 +1,128 @@
+"""
+Generate a synthetic purchase log with Zipf-distributed kupci and artikli.
+
+A few kupci and artikli account for most rows, as in real sales data:
+the k-th most popular of N items is drawn with probability proportional
+to 1 / k**s. Popularity is shuffled relative to label order so sorted
+output is not also sorted by frequency.
+
+    python benchmarks/synthetic.py --rows 1000000 --kupci 10000 --artikli 5000 -o log.parquet
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pyarrow as pa
+
+import common  # noqa: F401  (puts the repo root on sys.path)
+from matrica.export import MAX_EXCEL_ROWS
+
+DEFAULT_BATCH_ROWS = 1_000_000
+COLUMNS = ('Datum', 'Kupac', 'Artikl', 'Kol')
+
+
+def zipf_sampler(num_items, s, rng):
+    """draw(n) -> n codes in [0, num_items) with bounded Zipf(s) popularity."""
+    weights = 1.0 / np.arange(1, num_items + 1) ** s
+    cdf = np.cumsum(weights)
+    cdf /= cdf[-1]
+    popularity = rng.permutation(num_items).astype(np.int32)
+
+    def draw(n):
+        ranks = np.minimum(np.searchsorted(cdf, rng.random(n)), num_items - 1)
+        return popularity[ranks]
+
+    return draw
+
+
+def iter_log_batches(rows, num_kupaca, num_artikala, s=1.1, seed=0,
+                     batch_rows=DEFAULT_BATCH_ROWS):
+    """
+    The log as Arrow record batches of up to batch_rows rows: Datum
+    (dates over one year), Kupac ("K000123"), Artikl ("A000456") and Kol.
+    Memory use is bounded by batch_rows, whatever the total size.
+    """
+    rng = np.random.default_rng(seed)
+    kupci = pa.array([f"K{i:06d}" for i in range(num_kupaca)])
+    artikli = pa.array([f"A{i:06d}" for i in range(num_artikala)])
+    draw_kupac = zipf_sampler(num_kupaca, s, rng)
+    draw_artikl = zipf_sampler(num_artikala, s, rng)
+    start_day = np.datetime64('2024-01-01')
+
+    for offset in range(0, rows, batch_rows):
+        n = min(batch_rows, rows - offset)
+        yield pa.record_batch([
+            pa.array(start_day + rng.integers(0, 366, n).astype('timedelta64[D]')),
+            pa.DictionaryArray.from_arrays(pa.array(draw_kupac(n)), kupci).cast(pa.string()),
+            pa.DictionaryArray.from_arrays(pa.array(draw_artikl(n)), artikli).cast(pa.string()),
+            pa.array(rng.integers(1, 10, n, dtype=np.int32)),
+        ], names=list(COLUMNS))
+
+
+def make_frame(rows, num_kupaca, num_artikala, s=1.1, seed=0):
+    """The kupac/artikl columns as a categorical DataFrame, as load_data returns them."""
+    import pandas as pd
+
+    table = pa.Table.from_batches(iter_log_batches(rows, num_kupaca, num_artikala, s, seed))
+    return pd.DataFrame({
+        'Kupac': pd.Categorical(table['Kupac'].to_numpy(zero_copy_only=False)),
+        'Artikl': pd.Categorical(table['Artikl'].to_numpy(zero_copy_only=False)),
+    })
+
+
+def write_log(path, rows, num_kupaca, num_artikala, s=1.1, seed=0):
+    """Write the log as .parquet, .csv, .tsv or .xlsx, chosen by extension."""
+    batches = iter_log_batches(rows, num_kupaca, num_artikala, s, seed)
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+
+        batch = next(batches)
+        with pq.ParquetWriter(path, batch.schema) as writer:
+            writer.write_batch(batch)
+            for batch in batches:
+                writer.write_batch(batch)
+    elif extension in ('.csv', '.tsv'):
+        import pyarrow.csv as pa_csv
+
+        options = pa_csv.WriteOptions(delimiter='\t' if extension == '.tsv' else ',')
+        batch = next(batches)
+        with pa_csv.CSVWriter(path, batch.schema, write_options=options) as writer:
+            writer.write_batch(batch)
+            for batch in batches:
+                writer.write_batch(batch)
+    elif extension == '.xlsx':
+        from openpyxl import Workbook
+
+        if rows >= MAX_EXCEL_ROWS:
+            raise ValueError(f"xlsx holds at most {MAX_EXCEL_ROWS - 1:,} data rows")
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Prodaja")
+        ws.append(COLUMNS)
+        for batch in batches:
+            for row in zip(*(column.to_pylist() for column in batch.columns)):
+                ws.append(row)
+        wb.save(path)
+        wb.close()
+    else:
+        raise ValueError(f"Unsupported output extension: {extension}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help="10k .. 50M")
+    parser.add_argument('--kupci', type=int, default=10_000, help="1k .. 100k")
+    parser.add_argument('--artikli', type=int, default=5_000, help="1k .. 50k")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent s")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', required=True, help=".parquet, .csv, .tsv or .xlsx")
+    args = parser.parse_args(argv)
+
+    print(f"Writing {args.rows:,} rows to {args.output}...", file=sys.stderr)
+    write_log(args.output, args.rows, args.kupci, args.artikli, args.zipf, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Kupac × artikl matrix pipeline, usable without the Streamlit UI."""
+from .export import generate_excel_streaming
+from .formats import export_matrix, export_pairs, export_sparse
+from .loaders import (
+    available_engines,
+    detect_format,
+    iter_excel_pairs,
+    iter_pairs,
+    load_csv,
+    load_data,
+    load_excel,
+    load_parquet,
+    load_preview,
+    select_engine,
+)
+from .processing import PairMatrix, process_data, process_pairs
+
+__all__ = [
+    'PairMatrix',
+    'available_engines',
+    'detect_format',
+    'export_matrix',
+    'export_pairs',
+    'export_sparse',
+    'generate_excel_streaming',
+    'iter_excel_pairs',
+    'iter_pairs',
+    'load_csv',
+    'load_data',
+    'load_excel',
+    'load_parquet',
+    'load_preview',
+    'process_data',
+    'process_pairs',
+    'select_engine',
+]
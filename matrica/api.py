@@ -0,0 +1,246 @@
+"""
+HTTP API for generating matrices from other services (standard library only).
+
+    python -m matrica.api --port 8502 --workers 2
+
+POST /jobs?kupac=Kupac&artikl=Artikl&format=xlsx&filename=izvoz.xlsx
+    Request body is the raw input file. Optional parameters: engine,
+    backend, streaming=1, counts=1. Returns 202 with the job status.
+GET /jobs/{id}
+    Status, progress (0-100) and the current stage; totals once done.
+GET /jobs/{id}/result
+    The generated file, streamed; 409 while the job is still running.
+
+    curl --data-binary @izvoz.xlsx \\
+        'http://localhost:8502/jobs?kupac=Kupac&artikl=Artikl&filename=izvoz.xlsx'
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import loaders, pipeline
+from .export import BACKENDS
+from .jobs import DEFAULT_JOB_WORKERS, DONE, FAILED, JobRunner
+
+MAX_UPLOAD_BYTES = int(os.environ.get('MATRICA_API_MAX_UPLOAD_MB', 1024)) * 1024 * 1024
+# Queued + running jobs accepted before POST /jobs answers 503
+MAX_PENDING_JOBS = int(os.environ.get('MATRICA_API_MAX_PENDING', 16))
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def generate_file(input_path, output_path, kupac_col, artikl_col, output_format, engine=None,
+                  backend='xml', streaming=False, with_counts=False, progress_callback=None):
+    """Job body: pipeline.run on a file on disk, output written to output_path."""
+    try:
+        columns = loaders.load_preview(input_path, engine).columns
+        kupac_col = pipeline.resolve_column(columns, kupac_col)
+        artikl_col = pipeline.resolve_column(columns, artikl_col)
+        result = pipeline.run(
+            input_path, kupac_col, artikl_col, output_format, engine, streaming,
+            backend=backend, workers=1, with_counts=with_counts,
+            progress_callback=progress_callback,
+        )
+        with result.pop('output') as output, open(output_path, 'wb') as fh:
+            shutil.copyfileobj(output, fh)
+    except Exception:
+        os.remove(output_path)
+        raise
+    finally:
+        os.remove(input_path)
+
+    result.update(path=output_path, output_format=output_format)
+    return result
+
+
+def job_status(job):
+    status = {
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'stage': job.message,
+        'created': job.created,
+        'finished': job.finished,
+    }
+    if job.status == FAILED:
+        status['error'] = job.error
+    if job.status == DONE:
+        for key in ('num_rows', 'num_kupaca', 'num_artikala', 'true_count'):
+            status[key] = job.result[key]
+        status['result'] = f"/jobs/{job.id}/result"
+    return status
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "matrica"
+
+    def do_POST(self):
+        path = urlsplit(self.path).path.rstrip('/')
+        if path != '/jobs':
+            return self.send_json(HTTPStatus.NOT_FOUND, {'error': "Nepoznata putanja"})
+
+        try:
+            options = self.job_options()
+        except ValueError as exc:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': str(exc)})
+
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            return self.send_json(HTTPStatus.LENGTH_REQUIRED, {'error': "Nedostaje Content-Length"})
+        if length < 0:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': "Neispravan Content-Length"})
+        if length > MAX_UPLOAD_BYTES:
+            return self.send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': "Datoteka je prevelika"})
+        if self.server.runner.pending() >= MAX_PENDING_JOBS:
+            return self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {'error': "Previše poslova u redu"})
+
+        try:
+            input_path = self.receive_upload(length, options.pop('extension'))
+        except (OSError, ValueError) as exc:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': str(exc)})
+        output_name, _ = pipeline.output_file_info(options['output_format'])
+        job = self.server.runner.submit(
+            generate_file, input_path, self.server.output_path(output_name), **options,
+            label=output_name,
+        )
+        self.send_json(HTTPStatus.ACCEPTED, job_status(job), location=f"/jobs/{job.id}")
+
+    def do_GET(self):
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if len(parts) not in (2, 3) or parts[0] != 'jobs' or parts[2:] not in ([], ['result']):
+            return self.send_json(HTTPStatus.NOT_FOUND, {'error': "Nepoznata putanja"})
+
+        job = self.server.runner.get(parts[1])
+        if job is None:
+            return self.send_json(HTTPStatus.NOT_FOUND, {'error': f"Posao {parts[1]} ne postoji"})
+        if len(parts) == 2:
+            return self.send_json(HTTPStatus.OK, job_status(job))
+        if job.status != DONE:
+            return self.send_json(HTTPStatus.CONFLICT, job_status(job))
+        self.send_result(job)
+
+    def job_options(self):
+        """generate_file keyword arguments from the query string."""
+        query = {key: values[-1] for key, values in parse_qs(urlsplit(self.path).query).items()}
+        for name in ('kupac', 'artikl', 'filename'):
+            if not query.get(name):
+                raise ValueError(f"Nedostaje parametar {name}")
+
+        extension = loaders.file_extension(query['filename'])
+        loaders.detect_format(query['filename'])
+        output_format = query.get('format', 'xlsx')
+        if output_format not in pipeline.OUTPUT_FORMATS:
+            raise ValueError(f"Nepoznat format izvoza: {output_format}")
+        backend = query.get('backend', 'xml')
+        if backend not in BACKENDS:
+            raise ValueError(f"Nepoznat backend: {backend}")
+
+        return {
+            'kupac_col': query['kupac'],
+            'artikl_col': query['artikl'],
+            'output_format': output_format,
+            'engine': query.get('engine'),
+            'backend': backend,
+            'streaming': query.get('streaming') == '1',
+            'with_counts': query.get('counts') == '1',
+            'extension': extension,
+        }
+
+    def receive_upload(self, length, extension):
+        """
+        Copy the request body to a temp file without holding it in memory.
+        The file is removed again if the body ends early or the copy fails.
+        """
+        fd, path = tempfile.mkstemp(suffix=extension, dir=self.server.work_dir)
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                remaining = length
+                while remaining:
+                    chunk = self.rfile.read(min(COPY_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ValueError("Tijelo zahtjeva je kraće od Content-Length")
+                    fh.write(chunk)
+                    remaining -= len(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    def send_result(self, job):
+        file_name, mime = pipeline.output_file_info(job.result['output_format'])
+        path = job.result['path']
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', mime)
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.send_header('Content-Disposition', f'attachment; filename="{file_name}"')
+        self.end_headers()
+        with open(path, 'rb') as fh:
+            shutil.copyfileobj(fh, self.wfile, COPY_CHUNK_SIZE)
+
+    def send_json(self, status, body, location=None):
+        payload = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        if location:
+            self.send_header('Location', location)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class ApiServer(ThreadingHTTPServer):
+    """
+    HTTP server owning a JobRunner with `workers` threads and a work
+    directory for uploads and results; results of pruned jobs are deleted.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, workers=DEFAULT_JOB_WORKERS, work_dir=None):
+        super().__init__(address, ApiHandler)
+        self._tmp = None if work_dir else tempfile.TemporaryDirectory(prefix='matrica-api-')
+        self.work_dir = work_dir or self._tmp.name
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.runner = JobRunner(workers, on_discard=self.discard)
+
+    def output_path(self, file_name):
+        fd, path = tempfile.mkstemp(suffix=f"_{file_name}", dir=self.work_dir)
+        os.close(fd)
+        return path
+
+    def discard(self, job):
+        if job.result is not None and os.path.exists(job.result['path']):
+            os.remove(job.result['path'])
+
+    def server_close(self):
+        super().server_close()
+        self.runner.shutdown(wait=False)
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m matrica.api', description="HTTP API za matrice.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--workers', type=int, default=DEFAULT_JOB_WORKERS,
+                        help="broj poslova koji se izvršavaju istovremeno")
+    parser.add_argument('--work-dir', help="mapa za ulazne i izlazne datoteke (zadano: privremena)")
+    args = parser.parse_args(argv)
+
+    server = ApiServer((args.host, args.port), args.workers, args.work_dir)
+    print(f"matrica API na http://{args.host}:{server.server_port}/jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Run the pipeline over many input files, one output per input."""
+import csv
+import glob
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import loaders, pipeline
+from .cache import ParseCache
+
+SUMMARY_FILE = "sazetak.csv"
+SUMMARY_FIELDS = (
+    'file', 'output', 'source', 'rows', 'kupci', 'artikli', 'nnz',
+    'load_s', 'export_s', 'total_s', 'error',
+)
+
+
+def find_inputs(pattern):
+    """
+    Supported input files in a directory, or matching a glob pattern,
+    sorted by name.
+    """
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+    else:
+        paths = glob.glob(pattern)
+    return sorted(
+        path for path in paths
+        if os.path.isfile(path) and loaders.file_extension(path) in loaders.FORMATS
+    )
+
+
+def process_file(path, output_path, kupac_col, artikl_col, output_format='xlsx', engine=None,
+                 backend='xml', workers=1, streaming=False, with_counts=False, use_cache=False):
+    """
+    Load, process and export one file. Failures are reported in the
+    returned summary row instead of raised, so one bad file does not stop
+    the rest of a batch.
+    """
+    summary = dict.fromkeys(SUMMARY_FIELDS)
+    summary.update(file=path, output=output_path)
+    started = time.perf_counter()
+    try:
+        columns = loaders.load_preview(path, engine).columns
+        kupac_col = pipeline.resolve_column(columns, kupac_col)
+        artikl_col = pipeline.resolve_column(columns, artikl_col)
+
+        data, info = pipeline.load(
+            path, kupac_col, artikl_col, engine, streaming, ParseCache() if use_cache else None
+        )
+        loaded = time.perf_counter()
+        output, _, _ = pipeline.export(
+            data, kupac_col, artikl_col, output_format, backend, workers, with_counts
+        )
+        with output, open(output_path, 'wb') as fh:
+            shutil.copyfileobj(output, fh)
+
+        summary.update(
+            source=info['source'],
+            rows=data['num_rows'],
+            kupci=data['num_kupaca'],
+            artikli=data['num_artikala'],
+            nnz=data['true_count'],
+            load_s=round(loaded - started, 3),
+            export_s=round(time.perf_counter() - loaded, 3),
+        )
+    except Exception as exc:
+        summary['error'] = f"{type(exc).__name__}: {exc}"
+    summary['total_s'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def run_batch(paths, output_dir, kupac_col, artikl_col, output_format='xlsx', jobs=None,
+              on_done=None, **options):
+    """
+    process_file for every path, jobs files at a time in separate
+    processes (jobs=1 runs inline). Outputs go to output_dir as
+    <input stem>_<kind><ext>. on_done(summary) is called as each file
+    finishes; returns the summaries in input order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = [pipeline.default_output_path(path, output_format, output_dir) for path in paths]
+    # izvoz.xlsx and izvoz.csv would both become izvoz_matrix.xlsx; keep the
+    # source extension in the name for those
+    clashing = {output for output in outputs if outputs.count(output) > 1}
+    for i, path in enumerate(paths):
+        if outputs[i] in clashing:
+            stem, extension = os.path.splitext(outputs[i])
+            outputs[i] = f"{stem}_{loaders.file_extension(path).lstrip('.')}{extension}"
+    tasks = [
+        (path, output, kupac_col, artikl_col, output_format)
+        for path, output in zip(paths, outputs)
+    ]
+
+    if jobs == 1:
+        summaries = []
+        for task in tasks:
+            summaries.append(process_file(*task, **options))
+            if on_done:
+                on_done(summaries[-1])
+        return summaries
+
+    summaries = [None] * len(tasks)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(process_file, *task, **options): i for i, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            summary = summaries[futures[future]] = future.result()
+            if on_done:
+                on_done(summary)
+    return summaries
+
+
+def write_summary(summaries, path):
+    """Run summary as CSV, one row per input file."""
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.DictWriter(fh, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(summaries)
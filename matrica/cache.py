@@ -0,0 +1,119 @@
+"""Disk cache of parsed uploads, keyed by file content."""
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+
+from .loaders import detect_format, select_engine
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'MATRICA_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'kupac_artikl_matrica'),
+)
+DEFAULT_MAX_BYTES = int(os.environ.get('MATRICA_CACHE_MAX_MB', 1024)) * 1024 * 1024
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file):
+    """SHA-256 hex digest of a path or file-like object's bytes."""
+    digest = hashlib.sha256()
+    if hasattr(file, 'read'):
+        file.seek(0)
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        file.seek(0)
+    else:
+        with open(file, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Parsed two-column frames stored as Parquet files named by a hash of the
+    upload bytes and the selected columns. Hits refresh the file mtime and
+    the least recently used entries are evicted once max_bytes is exceeded.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, file, kupac_col, artikl_col, file_hash=None, engine=None):
+        file_hash = file_hash or file_sha256(file)
+        # Excel engines may stringify the same cells differently
+        engine = select_engine(file, engine) if detect_format(file) == 'excel' else ''
+        raw = f"{file_hash}\0{kupac_col!r}\0{artikl_col!r}\0{engine}".encode()
+        return hashlib.sha256(raw).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def get(self, key, columns=None):
+        """
+        Cached frame for key, or None. Parquet stores column labels as
+        strings; pass the original labels as columns to restore them.
+        """
+        path = self._path(key)
+        try:
+            df = pd.read_parquet(path)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        os.utime(path)
+        if columns is not None:
+            labels = {str(column): column for column in columns}
+            df.columns = [labels.get(label, label) for label in df.columns]
+        return df
+
+    def put(self, key, df):
+        # Write to a temp file first so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, self._path(key))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+
+    def entries(self):
+        """(path, size, mtime) of cached files, most recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.parquet'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: -entry[2])
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits max_bytes."""
+        total = 0
+        for path, size, _ in self.entries():
+            if total + size <= self.max_bytes:
+                total += size
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
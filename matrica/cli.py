@@ -0,0 +1,161 @@
+"""
+Headless kupac × artikl matrix generation.
+
+    python -m matrica izvoz.xlsx --kupac Kupac --artikl Artikl -o matrica.xlsx
+    python -m matrica izvoz.csv --kupac Kupac --artikl Artikl --format pairs-parquet
+
+A directory or glob pattern as input runs batch mode: every supported file
+is exported into the -o directory, --jobs files at a time, together with a
+sazetak.csv run summary.
+
+    python -m matrica 'poslovnice/*.xlsx' --kupac Kupac --artikl Artikl -o matrice/ --jobs 4
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+from . import batch, loaders, pipeline
+from .cache import ParseCache
+from .export import BACKENDS
+from .metrics import StageRecorder, stage_totals
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m matrica',
+        description="Generiraj kupac × artikl matricu bez Streamlita.",
+    )
+    parser.add_argument('input',
+                        help="xlsx, xls, csv, tsv ili parquet datoteka; mapa ili glob za batch")
+    parser.add_argument('--kupac', required=True, help="stupac s kupcima")
+    parser.add_argument('--artikl', required=True, help="stupac s artiklima")
+    parser.add_argument('-o', '--output',
+                        help="izlazna datoteka, u batch načinu mapa "
+                             "(zadano: <ulaz>_<vrsta> uz ulaznu datoteku)")
+    parser.add_argument('--format', default='xlsx', choices=list(pipeline.OUTPUT_FORMATS),
+                        help="format izvoza (zadano: xlsx)")
+    parser.add_argument('--engine', default='auto',
+                        choices=['auto'] + loaders.available_engines(), help="Excel čitač")
+    parser.add_argument('--backend', default='xml', choices=BACKENDS, help="Excel zapis matrice")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="paralelni procesi za listove Matrica_1..N (xml)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help="batch: broj datoteka koje se obrađuju istovremeno")
+    parser.add_argument('--streaming', action='store_true',
+                        help="čitaj red po red bez DataFrame-a (manje memorije)")
+    parser.add_argument('--counts', action='store_true',
+                        help="broj kupnji po paru (parovi / rijetka matrica)")
+    parser.add_argument('--cache', action='store_true',
+                        help="koristi disk cache učitanih datoteka")
+    parser.add_argument('--metrics', action='store_true',
+                        help="na stdout ispiši JSON s vremenom, CPU-om i memorijom po fazi")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="uz --metrics mjeri i vrh Python alokacija (tracemalloc, sporije)")
+    parser.add_argument('--metrics-in-summary', action='store_true',
+                        help="dodaj mjerenja faza do izvoza u Summary list (xlsx)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="bez ispisa napretka")
+    return parser
+
+
+def is_batch_input(path):
+    return os.path.isdir(path) or any(char in path for char in '*?[')
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+
+    def log(message):
+        if not args.quiet:
+            print(f"[{time.perf_counter() - started:7.1f}s] {message}", file=sys.stderr, flush=True)
+
+    if is_batch_input(args.input):
+        if args.metrics:
+            raise SystemExit("--metrics je podržan samo za jednu datoteku")
+        return run_batch(args, log)
+
+    def progress(pct):
+        log(f"zapisujem matricu... {pct}%")
+
+    try:
+        columns = loaders.load_preview(args.input, args.engine).columns
+    except (OSError, ValueError) as exc:
+        raise SystemExit(f"Ne mogu pročitati {args.input}: {exc}")
+    try:
+        kupac_col = pipeline.resolve_column(columns, args.kupac)
+        artikl_col = pipeline.resolve_column(columns, args.artikl)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    output_path = args.output or pipeline.default_output_path(args.input, args.format)
+
+    with StageRecorder(args.trace_memory) as recorder:
+        log(f"učitavam {args.input}")
+        data, info = pipeline.load(
+            args.input, kupac_col, artikl_col, args.engine, args.streaming,
+            ParseCache() if args.cache else None,
+        )
+        log(f"{data['num_rows']:,} redaka ({info['source']}), {data['num_kupaca']:,} kupaca, "
+            f"{data['num_artikala']:,} artikala, {data['true_count']:,} parova")
+
+        log(f"izvoz {args.format} -> {output_path}")
+        output, _, _ = pipeline.export(
+            data, kupac_col, artikl_col, args.format, args.backend, args.workers,
+            args.counts, progress, args.metrics_in_summary,
+        )
+        with output, open(output_path, 'wb') as fh:
+            shutil.copyfileobj(output, fh)
+
+    log("gotovo")
+    if args.metrics:
+        print(json.dumps({
+            'input': args.input,
+            'output': output_path,
+            'num_rows': data['num_rows'],
+            'num_kupaca': data['num_kupaca'],
+            'num_artikala': data['num_artikala'],
+            'true_count': data['true_count'],
+            'stages': recorder.stages,
+            'total': stage_totals(recorder.stages),
+        }, indent=2, ensure_ascii=False))
+    else:
+        print(output_path)
+    return 0
+
+
+def run_batch(args, log):
+    paths = batch.find_inputs(args.input)
+    if not paths:
+        raise SystemExit(f"Nema podržanih datoteka za {args.input}")
+    output_dir = args.output or os.path.join(
+        args.input if os.path.isdir(args.input) else os.path.dirname(args.input) or '.', 'matrice'
+    )
+    jobs = max(1, min(args.jobs or 1, len(paths)))
+    log(f"{len(paths)} datoteka, {jobs} istovremeno -> {output_dir}")
+
+    done = 0
+
+    def on_done(summary):
+        nonlocal done
+        done += 1
+        if summary['error']:
+            status = f"GREŠKA {summary['error']}"
+        else:
+            status = (f"{summary['rows']:,} redaka, {summary['kupci']:,} kupaca, "
+                      f"{summary['artikli']:,} artikala, {summary['nnz']:,} parova")
+        log(f"[{done}/{len(paths)}] {summary['file']}: {status} ({summary['total_s']:.1f}s)")
+
+    summaries = batch.run_batch(
+        paths, output_dir, args.kupac, args.artikl, args.format, jobs, on_done,
+        engine=args.engine, backend=args.backend, workers=args.workers,
+        streaming=args.streaming, with_counts=args.counts, use_cache=args.cache,
+    )
+    summary_path = os.path.join(output_dir, batch.SUMMARY_FILE)
+    batch.write_summary(summaries, summary_path)
+
+    failed = sum(1 for summary in summaries if summary['error'])
+    log(f"gotovo: {len(summaries) - failed} uspješno, {failed} s greškom")
+    print(summary_path)
+    return 1 if failed else 0
@@ -0,0 +1,481 @@
+"""Excel export of the kupac × artikl matrix."""
+import gc
+import itertools
+import multiprocessing
+import numbers
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from .metrics import stage
+from .processing import PairMatrix, top_n
+
+try:
+    import xlsxwriter
+    HAS_XLSXWRITER = True
+except ImportError:
+    HAS_XLSXWRITER = False
+
+BACKENDS = ('xml', 'openpyxl') + (('xlsxwriter',) if HAS_XLSXWRITER else ())
+
+# Excel sheet grid limits
+MAX_EXCEL_ROWS = 1_048_576
+MAX_EXCEL_COLS = 16_384
+
+# Block of the matrix written to one sheet: kupci [row_start, row_stop) x
+# artikli [col_start, col_stop)
+Tile = namedtuple('Tile', 'name row_start row_stop col_start col_stop')
+
+# Generated files larger than this roll over from memory to a temp file on disk
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+# TRUE and FALSE cells have the same length, so a whole row of booleans is a
+# single fixed-width numpy byte array and needs no per-cell Python objects
+TRUE_CELL = b'<c t="b"><v>1</v></c>'
+FALSE_CELL = b'<c t="b"><v>0</v></c>'
+
+SHEET_XML_HEADER = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    b'<sheetData>'
+)
+SHEET_XML_FOOTER = b'</sheetData></worksheet>'
+
+
+def matrix_tiles(num_kupaca, num_artikala):
+    """
+    Split the matrix into blocks that fit Excel's sheet grid. Every block
+    repeats the kupac label column and the header row, so it holds at most
+    MAX_EXCEL_ROWS - 1 kupci and MAX_EXCEL_COLS - 1 artikli. A matrix that
+    fits in one sheet yields a single tile named "Matrica"; otherwise the
+    tiles are Matrica_1..N, row block by row block.
+    """
+    row_step = MAX_EXCEL_ROWS - 1
+    col_step = MAX_EXCEL_COLS - 1
+    row_starts = range(0, max(num_kupaca, 1), row_step)
+    col_starts = range(0, max(num_artikala, 1), col_step)
+
+    tiles = []
+    for row_start in row_starts:
+        for col_start in col_starts:
+            tiles.append(Tile(
+                f"Matrica_{len(tiles) + 1}",
+                row_start, min(row_start + row_step, num_kupaca),
+                col_start, min(col_start + col_step, num_artikala),
+            ))
+    if len(tiles) == 1:
+        tiles[0] = tiles[0]._replace(name="Matrica")
+    return tiles
+
+
+def generate_excel_streaming(data, kupac_col, artikl_col, df_len, progress_callback=None,
+                             backend='xml', workers=None, stages=None):
+    """
+    Generate Excel by streaming rows, Summary first, then Matrica.
+    Never holds full matrix in memory. The xlsx is returned as a rewound
+    spooled temp file (on disk once it outgrows SPOOL_MAX_BYTES); the
+    caller owns it and should close it.
+
+    Matrices larger than an Excel sheet are split into Matrica_1..N (see
+    matrix_tiles) and the Summary sheet lists the block layout.
+
+    backend='xml' writes the Matrica worksheet XML directly into the xlsx
+    zip; backend='openpyxl' appends every row through openpyxl;
+    backend='xlsxwriter' uses xlsxwriter's constant_memory mode, which
+    flushes each row as soon as the next one starts.
+
+    workers > 1 (xml backend only) renders the Matrica_1..N sheets in a
+    process pool, one tile per task, and the parent only copies the finished
+    compressed parts into the zip. A single Matrica sheet is always written
+    in-process: starting the pool would cost more than it saves.
+
+    stages (metrics records) are listed on the Summary sheet; as Summary
+    is written first, only stages finished before the export can appear.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Nepoznat backend: {backend}")
+
+    tiles = matrix_tiles(data['num_kupaca'], data['num_artikala'])
+    step = _progress_reporter(progress_callback, sum(tile.row_stop - tile.row_start for tile in tiles))
+
+    if backend == 'xlsxwriter':
+        return _generate_xlsxwriter(data, kupac_col, df_len, tiles, step, stages)
+
+    # Create workbook; write-only sheets stream rows to temp files instead
+    # of keeping a cell object per value
+    wb = Workbook(write_only=True)
+
+    # === Sheet 1: Summary ===
+    # Written completely before Matrica: write-only sheets are append-only
+    ws_summary = wb.create_sheet("Summary")
+    with stage('summary'):
+        top_kupci, top_artikli = write_summary(ws_summary.append, data, df_len, tiles, stages)
+
+    # === Sheet 2..N: Matrica (streaming, one block after another) ===
+    sheets = [wb.create_sheet(tile.name) for tile in tiles]
+    output = new_output()
+
+    if backend == 'openpyxl':
+        with stage('matrix write'):
+            for ws_matrix, tile in zip(sheets, tiles):
+                _write_tile_openpyxl(ws_matrix, data, kupac_col, tile, step)
+        with stage('save'):
+            wb.save(output)
+    else:
+        # Save the workbook with empty Matrica sheets, then swap in our own XML
+        skeleton = BytesIO()
+        with stage('save'):
+            wb.save(skeleton)
+        parts = {
+            f"xl/worksheets/sheet{wb.sheetnames.index(tile.name) + 1}.xml": tile
+            for tile in tiles
+        }
+        parallel = bool(workers and workers > 1 and len(tiles) > 1)
+        with stage('matrix write'), zipfile.ZipFile(skeleton) as src, \
+                zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                if item.filename in parts:
+                    if parallel:
+                        continue
+                    with dst.open(item.filename, 'w', force_zip64=True) as fh:
+                        write_tile_xml(fh, data, kupac_col, parts[item.filename], step)
+                else:
+                    dst.writestr(item, src.read(item.filename))
+
+            if parallel:
+                _write_tiles_parallel(dst, parts, data, kupac_col, workers, progress_callback)
+
+    output.seek(0)
+
+    # Cleanup
+    wb.close()
+    del wb
+    gc.collect()
+
+    return output, top_kupci, top_artikli
+
+
+def new_output():
+    """Binary spooled temp file for a generated export."""
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+b')
+
+
+def _generate_xlsxwriter(data, kupac_col, df_len, tiles, step, stages=None):
+    output = new_output()
+    wb = xlsxwriter.Workbook(output, {'constant_memory': True})
+
+    # === Sheet 1: Summary ===
+    ws_summary = wb.add_worksheet("Summary")
+    summary_row = itertools.count()
+    with stage('summary'):
+        top_kupci, top_artikli = write_summary(
+            lambda row: ws_summary.write_row(next(summary_row), 0, row), data, df_len, tiles, stages
+        )
+
+    # === Sheet 2..N: Matrica (constant_memory: rows must be written in order) ===
+    with stage('matrix write'):
+        for tile in tiles:
+            ws_matrix = wb.add_worksheet(tile.name)
+            ws_matrix.write_row(0, 0, [kupac_col] + data['artikli'][tile.col_start:tile.col_stop])
+
+            row_buffer = np.zeros(tile.col_stop - tile.col_start, dtype=bool)
+            for row_idx, (kupac, positions) in enumerate(_tile_rows(data, tile), start=1):
+                row_buffer[positions] = True
+                ws_matrix.write_string(row_idx, 0, str(kupac))
+                ws_matrix.write_row(row_idx, 1, row_buffer.tolist())
+                row_buffer[positions] = False
+                step()
+
+    with stage('save'):
+        wb.close()
+    output.seek(0)
+    return output, top_kupci, top_artikli
+
+
+def write_summary(append, data, df_len, tiles=(), stages=None):
+    """
+    Emit the Summary sheet rows through append(row), including the block
+    layout when the matrix is split over several sheets and the stage
+    metrics, if given.
+    Returns the top 10 kupci and artikli.
+    """
+    kupci = data['kupci']
+    artikli = data['artikli']
+    num_kupaca = data['num_kupaca']
+    num_artikala = data['num_artikala']
+    true_count = data['true_count']
+    total_celija = num_kupaca * num_artikala
+
+    summary_rows = [
+        ["Metrika", "Vrijednost"],
+        ["Datum generiranja", datetime.now().strftime('%Y-%m-%d %H:%M')],
+        ["Ukupno redaka u izvoru", f"{df_len:,}"],
+        ["Broj unikatnih kupaca", f"{num_kupaca:,}"],
+        ["Broj unikatnih artikala", f"{num_artikala:,}"],
+        ["Veličina matrice", f"{num_kupaca:,} x {num_artikala:,}"],
+        ["Ukupno ćelija", f"{total_celija:,}"],
+        ["TRUE vrijednosti", f"{true_count:,}"],
+        ["FALSE vrijednosti", f"{total_celija - true_count:,}"],
+        ["% popunjenosti", f"{100*true_count/total_celija:.2f}%"],
+        ["Prosjek artikala po kupcu", f"{true_count/num_kupaca:.1f}"],
+        ["Prosjek kupaca po artiklu", f"{true_count/num_artikala:.1f}"],
+    ]
+    for row in summary_rows:
+        append(row)
+
+    # Top 10 kupaca
+    append([])
+    append(["TOP 10 KUPACA", "", "", "TOP 10 ARTIKALA"])
+    append(["Kupac", "Broj artikala", "", "Artikl", "Broj kupaca"])
+
+    top_kupci = top_n(kupci, data['kupac_counts'])
+    top_artikli = top_n(artikli, data['artikl_counts'])
+
+    for i in range(10):
+        row = []
+        if i < len(top_kupci):
+            row.extend([top_kupci[i][0], top_kupci[i][1], ""])
+        else:
+            row.extend(["", "", ""])
+        if i < len(top_artikli):
+            row.extend([top_artikli[i][0], top_artikli[i][1]])
+        append(row)
+
+    if len(tiles) > 1:
+        append([])
+        append(["RASPORED MATRICE"])
+        append(["List", "Kupci (redci)", "Artikli (stupci)", "Prvi kupac", "Prvi artikl"])
+        for tile in tiles:
+            append([
+                tile.name,
+                f"{tile.row_start + 1:,} - {tile.row_stop:,}",
+                f"{tile.col_start + 1:,} - {tile.col_stop:,}",
+                kupci[tile.row_start],
+                artikli[tile.col_start],
+            ])
+
+    if stages:
+        append([])
+        append(["MJERENJA", "Vrijeme (s)", "CPU (s)", "Vršni RSS (MB)", "Python vrh (MB)"])
+        for record in stages:
+            append([
+                record['stage'],
+                f"{record['wall_s']:.3f}",
+                f"{record['cpu_s']:.3f}",
+                "" if record['peak_rss_mb'] is None else f"{record['peak_rss_mb']:.1f}",
+                "" if record['py_peak_mb'] is None else f"{record['py_peak_mb']:.1f}",
+            ])
+
+    return top_kupci, top_artikli
+
+
+def _progress_reporter(progress_callback, total_rows):
+    """Returns a step() to call once per written matrix row."""
+    rows_done = itertools.count()
+
+    def step():
+        idx = next(rows_done)
+        # Update progress every 100 rows
+        if progress_callback and idx % 100 == 0:
+            progress_callback(40 + int(50 * idx / total_rows))
+
+    return step
+
+
+def _tile_rows(data, tile):
+    """(kupac, artikl positions within the tile) for every row of a tile."""
+    kupci = data['kupci']
+    matrix = data['matrix']
+    full_width = tile.col_start == 0 and tile.col_stop == data['num_artikala']
+
+    for idx in range(tile.row_start, tile.row_stop):
+        positions = matrix.row(idx)
+        if not full_width:
+            lo, hi = np.searchsorted(positions, [tile.col_start, tile.col_stop])
+            positions = positions[lo:hi] - tile.col_start
+        yield kupci[idx], positions
+
+
+def _write_tile_openpyxl(ws_matrix, data, kupac_col, tile, step):
+    # Header row
+    ws_matrix.append([kupac_col] + data['artikli'][tile.col_start:tile.col_stop])
+
+    # Reusable row buffer: only the kupac's known True positions are flipped
+    row_buffer = np.zeros(tile.col_stop - tile.col_start, dtype=bool)
+
+    # Stream data rows - one at a time, never hold in memory
+    for idx, (kupac, positions) in enumerate(_tile_rows(data, tile)):
+        row_buffer[positions] = True
+        row = [kupac] + row_buffer.tolist()
+        row_buffer[positions] = False
+        ws_matrix.append(row)
+        step()
+
+        # Garbage collect every 500 rows
+        if idx % 500 == 0:
+            gc.collect()
+
+
+def _string_cell(value):
+    # Inline strings avoid building a shared strings table for the labels
+    text = escape(ILLEGAL_CHARACTERS_RE.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'.encode()
+
+
+def _label_cell(value):
+    # Header labels keep their type, as openpyxl and xlsxwriter write them:
+    # a numeric column header such as 2023 stays a number
+    if isinstance(value, (bool, np.bool_)):
+        return b'<c t="b"><v>%d</v></c>' % bool(value)
+    if isinstance(value, numbers.Integral):
+        return b'<c><v>%d</v></c>' % int(value)
+    if isinstance(value, numbers.Real) and np.isfinite(value):
+        return f'<c><v>{float(value)!r}</v></c>'.encode()
+    return _string_cell(value)
+
+
+def write_tile_xml(fh, data, kupac_col, tile, step=None):
+    """
+    Write one Matrica worksheet (a tile of the matrix) as SpreadsheetML
+    bytes to a binary file. Rows are rendered from pre-encoded TRUE/FALSE
+    cell templates.
+    """
+    fh.write(SHEET_XML_HEADER)
+    labels = [kupac_col] + data['artikli'][tile.col_start:tile.col_stop]
+    fh.write(b'<row r="1">' + b''.join(_label_cell(value) for value in labels) + b'</row>')
+
+    cells = np.full(tile.col_stop - tile.col_start, FALSE_CELL, dtype=f"S{len(FALSE_CELL)}")
+    for row_idx, (kupac, positions) in enumerate(_tile_rows(data, tile), start=2):
+        cells[positions] = TRUE_CELL
+        fh.write(b'<row r="%d">' % row_idx + _string_cell(kupac) + cells.tobytes() + b'</row>')
+        cells[positions] = FALSE_CELL
+        if step:
+            step()
+
+    fh.write(SHEET_XML_FOOTER)
+
+
+class _DeflateWriter:
+    """Binary file wrapper producing a raw deflate stream plus zip CRC/sizes."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.crc = 0
+        self.file_size = 0
+        self.compress_size = 0
+        self._compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+
+    def write(self, chunk):
+        self.crc = zlib.crc32(chunk, self.crc)
+        self.file_size += len(chunk)
+        self._write_compressed(self._compressor.compress(chunk))
+
+    def finish(self):
+        self._write_compressed(self._compressor.flush())
+
+    def _write_compressed(self, chunk):
+        self.compress_size += len(chunk)
+        self.fh.write(chunk)
+
+
+def _tile_task(tile, data):
+    """
+    Integer codes and labels for one tile, rebased so the tile is a
+    self-contained matrix starting at (0, 0).
+    """
+    matrix = data['matrix']
+    start, stop = matrix.indptr[tile.row_start], matrix.indptr[tile.row_stop]
+    indices = matrix.indices[start:stop]
+    row_codes = np.repeat(
+        np.arange(tile.row_stop - tile.row_start, dtype=np.int32),
+        np.diff(matrix.indptr[tile.row_start:tile.row_stop + 1]),
+    )
+    mask = (indices >= tile.col_start) & (indices < tile.col_stop)
+    num_rows = tile.row_stop - tile.row_start
+    num_cols = tile.col_stop - tile.col_start
+
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_codes[mask], minlength=num_rows), out=indptr[1:])
+    local = Tile(tile.name, 0, num_rows, 0, num_cols)
+    return (
+        local,
+        data['kupci'][tile.row_start:tile.row_stop],
+        data['artikli'][tile.col_start:tile.col_stop],
+        indptr,
+        (indices[mask] - tile.col_start).astype(np.int32),
+    )
+
+
+def _render_tile(directory, kupac_col, tile, kupci, artikli, indptr, indices):
+    # Runs in a worker process: render and deflate one sheet to a temp file
+    data = {
+        'kupci': kupci,
+        'artikli': artikli,
+        'num_artikala': len(artikli),
+        'matrix': PairMatrix(indptr, indices, (len(kupci), len(artikli))),
+    }
+    path = os.path.join(directory, f"{tile.name}.deflate")
+    with open(path, 'wb') as fh:
+        writer = _DeflateWriter(fh)
+        write_tile_xml(writer, data, kupac_col, tile)
+        writer.finish()
+    return path, writer.crc, writer.file_size, writer.compress_size
+
+
+def _write_tiles_parallel(dst, parts, data, kupac_col, workers, progress_callback):
+    # spawn, not fork: this runs inside Streamlit's and the job runner's
+    # threads, and forking a multithreaded process can deadlock the child
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as directory, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [
+            pool.submit(_render_tile, directory, kupac_col, *_tile_task(tile, data))
+            for tile in parts.values()
+        ]
+        for done, (name, future) in enumerate(zip(parts, futures), start=1):
+            _add_deflated_entry(dst, name, *future.result())
+            os.remove(future.result()[0])
+            if progress_callback:
+                progress_callback(40 + int(50 * done / len(futures)))
+
+
+def _add_deflated_entry(dst, name, path, crc, file_size, compress_size):
+    """
+    Append an already deflated member to a zip opened for writing.
+
+    zipfile has no public API for adding pre-compressed data, so this
+    writes CPython's ZipFile state directly (fp, filelist, NameToInfo,
+    start_dir, _didModify) as ZipFile.writestr does. close() only writes
+    the central directory when _didModify is set, so it is set here
+    rather than relying on earlier writes.
+    """
+    assert dst.mode in ('w', 'x', 'a') and not dst._writing, \
+        "zip must be open for writing with no member being written"
+    zinfo = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.CRC = crc
+    zinfo.file_size = file_size
+    zinfo.compress_size = compress_size
+    zinfo.header_offset = dst.fp.tell()
+    zip64 = file_size > zipfile.ZIP64_LIMIT or compress_size > zipfile.ZIP64_LIMIT
+
+    dst.fp.write(zinfo.FileHeader(zip64))
+    with open(path, 'rb') as fh:
+        shutil.copyfileobj(fh, dst.fp)
+
+    dst.filelist.append(zinfo)
+    dst.NameToInfo[name] = zinfo
+    dst.start_dir = dst.fp.tell()
+    dst._didModify = True
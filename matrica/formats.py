@@ -0,0 +1,237 @@
+"""Non-Excel-matrix exports built from the process_data result."""
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from .export import MAX_EXCEL_ROWS, new_output
+
+try:
+    import scipy.io
+    import scipy.sparse
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+PAIR_FORMATS = ('csv', 'parquet', 'xlsx')
+MATRIX_FORMATS = ('parquet', 'feather')
+SPARSE_FORMATS = ('npz', 'mtx') if HAS_SCIPY else ()
+
+# Upper bound on cells per dense batch (one byte each while building), so
+# a batch stays around 16 MB whatever the number of artikli
+BATCH_CELLS = 16 * 1024 * 1024
+# Cells per Parquet row group (bit-packed, so 64 MB). The writer keeps
+# metadata for every row group × column, so row groups are sized by this
+# budget rather than by the dense build batch
+ROW_GROUP_CELLS = 512 * 1024 * 1024
+
+# (mime type, file extension) per output format
+FILE_TYPES = {
+    'xlsx': ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", '.xlsx'),
+    'csv': ("text/csv", '.csv'),
+    'parquet': ("application/vnd.apache.parquet", '.parquet'),
+    'feather': ("application/vnd.apache.arrow.file", '.feather'),
+    # Sparse matrix + label files bundled in one zip
+    'npz': ("application/zip", '.zip'),
+    'mtx': ("application/zip", '.zip'),
+}
+
+COUNT_COL = "Broj kupnji"
+
+
+def pairs_table(data, kupac_col, artikl_col, with_counts=False):
+    """
+    Deduplicated (kupac, artikl) pairs as an Arrow table, one row per True
+    cell, sorted by kupac then artikl. Labels are dictionary encoded, so the
+    table costs two int32 code arrays plus the unique labels. Column names
+    are the str() of the labels, as Arrow requires (headers may be numbers).
+    """
+    matrix = data['matrix']
+    columns = {
+        str(kupac_col): pa.DictionaryArray.from_arrays(
+            pa.array(matrix.row_codes()), pa.array(data['kupci'], pa.string())
+        ),
+        str(artikl_col): pa.DictionaryArray.from_arrays(
+            pa.array(matrix.indices), pa.array(data['artikli'], pa.string())
+        ),
+    }
+    if with_counts:
+        columns[COUNT_COL] = pa.array(matrix.counts)
+    return pa.table(columns)
+
+
+def export_pairs(data, kupac_col, artikl_col, fmt='csv', with_counts=False):
+    """
+    Write the pairs in long format, proportional to nnz rather than
+    num_kupaca × num_artikala. Returns a rewound spooled temp file the
+    caller should close.
+    """
+    if fmt not in PAIR_FORMATS:
+        raise ValueError(f"Nepoznat format: {fmt}")
+    if with_counts and data['matrix'].counts is None:
+        raise ValueError("Broj kupnji nije poznat za ove podatke")
+
+    table = pairs_table(data, kupac_col, artikl_col, with_counts)
+    output = new_output()
+
+    if fmt == 'parquet':
+        pq.write_table(table, output)
+    elif fmt == 'csv':
+        pa_csv.write_csv(_decode(table), output)
+    else:
+        _write_pairs_xlsx(output, table)
+
+    output.seek(0)
+    return output
+
+
+def _decode(table):
+    # Writers that cannot handle dictionary columns get plain strings
+    return table.cast(pa.schema([
+        (field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+        for field in table.schema
+    ]))
+
+
+def _write_pairs_xlsx(output, table):
+    """Pairs sheet(s) Parovi / Parovi_1..N, split at Excel's row limit."""
+    wb = Workbook(write_only=True)
+    rows_per_sheet = MAX_EXCEL_ROWS - 1
+    num_sheets = max(1, -(-table.num_rows // rows_per_sheet))
+
+    for sheet in range(num_sheets):
+        name = "Parovi" if num_sheets == 1 else f"Parovi_{sheet + 1}"
+        ws = wb.create_sheet(name)
+        ws.append(table.column_names)
+        block = table.slice(sheet * rows_per_sheet, rows_per_sheet)
+        for batch in _decode(block).to_batches():
+            for row in zip(*(column.to_pylist() for column in batch.columns)):
+                ws.append(row)
+
+    wb.save(output)
+    wb.close()
+
+
+def matrix_schema(data, kupac_col):
+    """kupac label column followed by one boolean column per artikl."""
+    return pa.schema(
+        [pa.field(str(kupac_col), pa.string())]
+        + [pa.field(str(artikl), pa.bool_()) for artikl in data['artikli']]
+    )
+
+
+def iter_matrix_batches(data, kupac_col, batch_rows=None):
+    """
+    Dense matrix as Arrow record batches of batch_rows kupci each (by
+    default as many as fit in BATCH_CELLS). Only one batch is materialised
+    at a time; Arrow stores the booleans bit-packed.
+    """
+    matrix = data['matrix']
+    kupci = data['kupci']
+    num_artikala = data['num_artikala']
+    schema = matrix_schema(data, kupac_col)
+    batch_rows = batch_rows or max(1, BATCH_CELLS // max(num_artikala, 1))
+
+    for start in range(0, len(kupci), batch_rows):
+        stop = min(start + batch_rows, len(kupci))
+        block = np.zeros((stop - start, num_artikala), dtype=bool)
+        lo, hi = matrix.indptr[start], matrix.indptr[stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(matrix.indptr[start:stop + 1]))
+        block[rows, matrix.indices[lo:hi]] = True
+
+        columns = [pa.array(kupci[start:stop], pa.string())]
+        columns += [pa.array(block[:, col]) for col in range(num_artikala)]
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def export_matrix(data, kupac_col, fmt='parquet'):
+    """
+    Write the dense kupac × artikl matrix as Parquet (row groups of about
+    ROW_GROUP_CELLS; sparse booleans RLE-compress very well) or as an
+    uncompressed Arrow IPC / Feather v2 file that pandas/pyarrow can
+    memory-map. Returns a rewound spooled temp file the caller should close.
+    """
+    if fmt not in MATRIX_FORMATS:
+        raise ValueError(f"Nepoznat format: {fmt}")
+
+    schema = matrix_schema(data, kupac_col)
+    output = new_output()
+
+    if fmt == 'parquet':
+        _write_matrix_parquet(output, data, kupac_col, schema)
+    else:
+        with pa.ipc.new_file(output, schema) as writer:
+            for batch in iter_matrix_batches(data, kupac_col):
+                writer.write_batch(batch)
+
+    output.seek(0)
+    return output
+
+
+def _write_matrix_parquet(output, data, kupac_col, schema):
+    # Each row group is built bit-packed straight from the CSR rows (no
+    # dense batch, one Arrow array per column). Statistics are only kept
+    # for the kupac column; per-artikl min/max of booleans says little
+    kupci = data['kupci']
+    group_rows = max(1, ROW_GROUP_CELLS // max(data['num_artikala'], 1))
+    with pq.ParquetWriter(output, schema, write_statistics=[schema.field(0).name]) as writer:
+        for start in range(0, len(kupci), group_rows):
+            stop = min(start + group_rows, len(kupci))
+            packed = _packed_columns(data['matrix'], start, stop, data['num_artikala'])
+            columns = [pa.array(kupci[start:stop], pa.string())]
+            columns += [
+                pa.Array.from_buffers(pa.bool_(), stop - start, [None, pa.py_buffer(bits)])
+                for bits in packed
+            ]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema), row_group_size=stop - start)
+            del columns, packed
+
+
+def _packed_columns(matrix, start, stop, num_artikala):
+    """
+    Rows start:stop of the matrix as bits, one uint8 row per artikl, in
+    Arrow's LSB-first boolean layout.
+    """
+    num_rows = stop - start
+    packed = np.zeros((num_artikala, (num_rows + 7) // 8), dtype=np.uint8)
+    lo, hi = matrix.indptr[start], matrix.indptr[stop]
+    rows = np.repeat(np.arange(num_rows), np.diff(matrix.indptr[start:stop + 1]))
+    np.bitwise_or.at(packed, (matrix.indices[lo:hi], rows >> 3), np.left_shift(1, rows & 7).astype(np.uint8))
+    return packed
+
+
+def export_sparse(data, kupac_col, artikl_col, fmt='npz', with_counts=False):
+    """
+    Zip bundle with the matrix as scipy.sparse .npz (CSR) or MatrixMarket
+    .mtx, plus kupci.csv / artikli.csv mapping row/column index to label.
+    Built straight from the CSR codes, never as a dense grid. Values are
+    1 (a pattern matrix for .mtx) or, with_counts, source rows per pair.
+    Returns a rewound spooled temp file the caller should close.
+    """
+    if fmt not in SPARSE_FORMATS:
+        raise ValueError(f"Nepoznat format: {fmt}")
+    if with_counts and data['matrix'].counts is None:
+        raise ValueError("Broj kupnji nije poznat za ove podatke")
+
+    matrix = data['matrix'].to_scipy(with_counts)
+    output = new_output()
+
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        with bundle.open(f"matrica.{fmt}", 'w', force_zip64=True) as fh:
+            if fmt == 'npz':
+                scipy.sparse.save_npz(fh, matrix, compressed=False)
+            else:
+                scipy.io.mmwrite(fh, matrix, field='integer' if with_counts else 'pattern')
+        for name, labels, label_col in (
+            ("kupci.csv", data['kupci'], kupac_col),
+            ("artikli.csv", data['artikli'], artikl_col),
+        ):
+            with bundle.open(name, 'w') as fh:
+                pd.DataFrame({'index': np.arange(len(labels)), label_col: labels}).to_csv(fh, index=False)
+
+    output.seek(0)
+    return output
@@ -0,0 +1,117 @@
+"""Background execution of pipeline runs, polled by the caller."""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_JOB_WORKERS = int(os.environ.get('MATRICA_JOB_WORKERS', 2))
+# Finished jobs kept for reconnecting; older ones are dropped
+MAX_FINISHED_JOBS = int(os.environ.get('MATRICA_MAX_FINISHED_JOBS', 20))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Job:
+    """
+    State of one background run. The worker thread updates progress,
+    message and finally result or error; readers only poll attributes.
+    """
+
+    def __init__(self, key=None, label=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.label = label
+        self.status = QUEUED
+        self.progress = 0
+        self.message = "Čeka na slobodan proces..."
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+    def update(self, pct, message=None):
+        self.progress = pct
+        if message is not None:
+            self.message = message
+
+
+class JobRunner:
+    """
+    Thread pool running Job functions, shared across sessions (for the app
+    via st.cache_resource) so a job outlives the script run that started it
+    and any session can look it up by id. on_discard(job) is called for
+    finished jobs dropped from the history, e.g. to delete their files.
+    """
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, max_finished=MAX_FINISHED_JOBS,
+                 on_discard=None):
+        self.max_finished = max_finished
+        self.on_discard = on_discard
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix='matrica-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, key=None, label=None, **kwargs):
+        """
+        Run fn(*args, progress_callback=job.update, **kwargs) in the
+        background; its return value becomes job.result.
+        """
+        job = Job(key, label)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        try:
+            job.result = fn(*args, progress_callback=job.update, **kwargs)
+            job.status = DONE
+        except Exception as exc:
+            job.error = f"{type(exc).__name__}: {exc}"
+            job.status = FAILED
+        job.finished = time.time()
+        self._prune()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find(self, key):
+        """Most recent job for key that has not failed, or None."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.key == key and job.status != FAILED]
+        return max(jobs, key=lambda job: job.created, default=None)
+
+    def jobs(self):
+        """All known jobs, newest first."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: -job.created)
+
+    def pending(self):
+        """Number of queued or running jobs."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def _prune(self):
+        with self._lock:
+            finished = sorted(
+                (job for job in self._jobs.values() if job.done), key=lambda job: job.finished
+            )
+            dropped = finished[:max(0, len(finished) - self.max_finished)]
+            for job in dropped:
+                del self._jobs[job.id]
+        if self.on_discard:
+            for job in dropped:
+                self.on_discard(job)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
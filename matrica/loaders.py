@@ -0,0 +1,292 @@
+"""Readers for uploaded purchase exports."""
+import csv
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+try:
+    import python_calamine  # noqa: F401
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+PREVIEW_ROWS = 100
+
+# Fallback readers per extension when calamine is not installed
+DEFAULT_ENGINES = {
+    '.xlsx': 'openpyxl',
+    '.xls': 'xlrd',
+}
+
+# Input format per file extension
+FORMATS = {
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+}
+
+# Extensions accepted by the uploader
+UPLOAD_TYPES = [ext.lstrip('.') for ext in FORMATS]
+
+# pyarrow CSV block size; each block is parsed in parallel and yielded as one chunk
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+
+# pandas' default na_values: read_excel turns these cell texts into NaN
+EXCEL_NA_STRINGS = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+
+def file_extension(file):
+    """Lower-case extension of a path or uploaded file object."""
+    name = getattr(file, 'name', file)
+    return os.path.splitext(str(name))[1].lower()
+
+
+def detect_format(file):
+    """Input format ('excel', 'csv', 'tsv' or 'parquet') from the file extension."""
+    ext = file_extension(file)
+    try:
+        return FORMATS[ext]
+    except KeyError:
+        raise ValueError(f"Nepodržan format datoteke: {ext or '?'}") from None
+
+
+def available_engines():
+    """Excel reader engines usable in this environment, fastest first."""
+    engines = ['calamine'] if HAS_CALAMINE else []
+    return engines + list(DEFAULT_ENGINES.values())
+
+
+def select_engine(file, engine=None):
+    """
+    Pick the reader engine for a file.
+    calamine (Rust) reads both xlsx and xls and is preferred when installed.
+    """
+    if engine and engine != 'auto':
+        return engine
+    if HAS_CALAMINE:
+        return 'calamine'
+    return DEFAULT_ENGINES.get(file_extension(file), 'openpyxl')
+
+
+def _rewind(file):
+    if hasattr(file, 'seek'):
+        file.seek(0)
+
+
+def load_preview(file, engine=None):
+    """Read only the header row and a small sample for column selection."""
+    fmt = detect_format(file)
+    _rewind(file)
+    if fmt == 'parquet':
+        batch = next(pq.ParquetFile(file).iter_batches(batch_size=PREVIEW_ROWS), None)
+        if batch is None:
+            return pq.read_schema(file).empty_table().to_pandas()
+        return batch.to_pandas()
+    if fmt in ('csv', 'tsv'):
+        return pd.read_csv(file, sep=_delimiter(file, fmt), nrows=PREVIEW_ROWS)
+    return pd.read_excel(file, nrows=PREVIEW_ROWS, engine=select_engine(file, engine))
+
+
+def load_data(file, kupac_col, artikl_col, engine=None):
+    """
+    Load the kupac/artikl columns of any supported format as string
+    categories, ready for process_data. engine only applies to Excel.
+    """
+    fmt = detect_format(file)
+    if fmt == 'parquet':
+        return load_parquet(file, kupac_col, artikl_col)
+    if fmt in ('csv', 'tsv'):
+        return load_csv(file, kupac_col, artikl_col)
+    return load_excel(file, kupac_col, artikl_col, engine)
+
+
+def load_excel(file, kupac_col, artikl_col, engine=None):
+    """Load only required columns with optimized dtypes."""
+    _rewind(file)
+    # Read as strings to avoid type comparison issues, then store each
+    # column as a category so repeated kupac/artikl values share memory.
+    # usecols is a callable: a list would treat integer headers as positions
+    df = pd.read_excel(
+        file,
+        usecols=lambda column: column in (kupac_col, artikl_col),
+        dtype=str,
+        engine=select_engine(file, engine),
+    )
+    return df.astype('category')
+
+
+def load_csv(file, kupac_col, artikl_col):
+    """Load the two columns from CSV/TSV in pyarrow-parsed chunks."""
+    chunks = [_as_categories(chunk) for chunk in _iter_csv_chunks(file, kupac_col, artikl_col)]
+    if not chunks:
+        return pd.DataFrame({kupac_col: [], artikl_col: []}, dtype='category')
+    # Chunks carry their own categories; union them instead of falling back to object
+    return pd.DataFrame({
+        col: pd.api.types.union_categoricals([chunk[col] for chunk in chunks], sort_categories=True)
+        for col in chunks[0].columns
+    })
+
+
+def load_parquet(file, kupac_col, artikl_col):
+    """Load only the two columns from Parquet (column projection)."""
+    _rewind(file)
+    table = pq.read_table(file, columns=list(dict.fromkeys([kupac_col, artikl_col])))
+    return _cast_to_strings(table).to_pandas().astype('category')
+
+
+def iter_pairs(file, kupac_col, artikl_col):
+    """
+    Yield (kupac, artikl) string pairs from any streamable format
+    (xlsx, csv, tsv, parquet) without materialising the whole table.
+    """
+    fmt = detect_format(file)
+    if fmt == 'parquet':
+        return _iter_parquet_pairs(file, kupac_col, artikl_col)
+    if fmt in ('csv', 'tsv'):
+        return _iter_csv_pairs(file, kupac_col, artikl_col)
+    if file_extension(file) == '.xlsx':
+        return iter_excel_pairs(file, kupac_col, artikl_col)
+    raise ValueError("Streaming učitavanje nije podržano za xls")
+
+
+def _as_categories(df):
+    # Missing values stay missing; everything else becomes a string category
+    return df.astype('string').astype('category')
+
+
+def _delimiter(file, fmt):
+    """Tab for TSV; for CSV sniff the delimiter from the first 64 KB."""
+    if fmt == 'tsv':
+        return '\t'
+    _rewind(file)
+    if hasattr(file, 'read'):
+        sample = file.read(64 * 1024)
+    else:
+        with open(file, 'rb') as fh:
+            sample = fh.read(64 * 1024)
+    _rewind(file)
+    if isinstance(sample, bytes):
+        sample = sample.decode('utf-8', errors='ignore')
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;|\t').delimiter
+    except csv.Error:
+        return ','
+
+
+def _iter_csv_batches(file, kupac_col, artikl_col):
+    columns = list(dict.fromkeys([str(kupac_col), str(artikl_col)]))
+    delimiter = _delimiter(file, detect_format(file))
+    _rewind(file)
+    reader = pa_csv.open_csv(
+        file,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={col: pa.string() for col in columns},
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield batch
+
+
+def _iter_csv_chunks(file, kupac_col, artikl_col):
+    for batch in _iter_csv_batches(file, kupac_col, artikl_col):
+        yield batch.to_pandas()
+
+
+def _iter_csv_pairs(file, kupac_col, artikl_col):
+    for batch in _iter_csv_batches(file, kupac_col, artikl_col):
+        yield from _batch_pairs(batch, kupac_col, artikl_col)
+
+
+def _iter_parquet_pairs(file, kupac_col, artikl_col):
+    _rewind(file)
+    columns = list(dict.fromkeys([kupac_col, artikl_col]))
+    for batch in pq.ParquetFile(file).iter_batches(columns=columns):
+        yield from _batch_pairs(_cast_to_strings(batch), kupac_col, artikl_col)
+
+
+def _cast_to_strings(data):
+    """Cast every column of an Arrow table/batch to string, keeping nulls."""
+    arrays = [data.column(i).cast(pa.string()) for i in range(data.num_columns)]
+    return type(data).from_arrays(arrays, names=data.schema.names)
+
+
+def _batch_pairs(batch, kupac_col, artikl_col):
+    names = batch.schema.names
+    kupci = batch.column(names.index(str(kupac_col))).to_pylist()
+    artikli = batch.column(names.index(str(artikl_col))).to_pylist()
+    return zip(kupci, artikli)
+
+
+def _cell_to_str(value):
+    """Mirror pandas' dtype=str conversion of an openpyxl cell value."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _column_to_str():
+    """
+    _cell_to_str for the data cells of one column, as read_excel(dtype=str)
+    gives them: EXCEL_NA_STRINGS become None, and since pandas converts the
+    column's unique values, True, 1 and 1.0 (False, 0 and 0.0) all take the
+    text of whichever of them appears first.
+    """
+    first_text = {}
+
+    def convert(value):
+        if isinstance(value, str):
+            return None if value in EXCEL_NA_STRINGS else value
+        if isinstance(value, (bool, int, float)) and value in (0, 1):
+            if value not in first_text:
+                first_text[value] = _cell_to_str(value)
+            return first_text[value]
+        return _cell_to_str(value)
+
+    return convert
+
+
+def iter_excel_pairs(file, kupac_col, artikl_col):
+    """
+    Yield (kupac, artikl) string pairs from the first worksheet without
+    building a DataFrame. Uses openpyxl read_only mode, so only the current
+    row is held in memory. Missing values and pandas' default NA strings
+    are yielded as None, so labels match load_excel. Only xlsx is supported (openpyxl cannot read legacy xls).
+    """
+    from openpyxl import load_workbook
+
+    _rewind(file)
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [_cell_to_str(value) for value in next(rows, ())]
+        try:
+            kupac_idx = header.index(str(kupac_col))
+            artikl_idx = header.index(str(artikl_col))
+        except ValueError:
+            raise ValueError(f"Stupci {kupac_col!r}/{artikl_col!r} nisu u zaglavlju") from None
+
+        kupac_to_str, artikl_to_str = _column_to_str(), _column_to_str()
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            if kupac_idx >= len(row) or artikl_idx >= len(row):
+                # Short rows: trailing empty cells are not reported
+                row = tuple(row) + (None,) * (max(kupac_idx, artikl_idx) + 1 - len(row))
+            yield kupac_to_str(row[kupac_idx]), artikl_to_str(row[artikl_idx])
+    finally:
+        wb.close()
@@ -0,0 +1,159 @@
+"""
+Per-stage wall time, CPU time and memory of a pipeline run.
+
+Pipeline code marks its stages with `with stage('parse'):`; that is a
+no-op unless a StageRecorder is active in the current thread/context:
+
+    with StageRecorder() as recorder:
+        data, _ = pipeline.load(...)
+    recorder.stages  # [{'stage': 'parse', 'wall_s': ..., ...}, ...]
+"""
+import contextvars
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_recorder = contextvars.ContextVar('matrica_stage_recorder', default=None)
+
+# Seconds between RSS samples while a stage runs
+RSS_SAMPLE_INTERVAL = 0.01
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the current process in MB over its whole
+    lifetime, or None if unknown. Only meaningful per run in a fresh
+    process (see benchmarks); stages use current_rss_mb samples instead.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def current_rss_mb():
+    """Current resident set size of the process in MB, or None without /proc."""
+    if resource is None:
+        return None
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+    except OSError:
+        return None
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+class _RssSampler:
+    """
+    Highest current RSS seen from construction until stop(), sampled on a
+    daemon thread every RSS_SAMPLE_INTERVAL seconds and at both ends.
+    """
+
+    def __init__(self):
+        self.peak = current_rss_mb()
+        self._done = threading.Event()
+        self._thread = None
+        if self.peak is not None:
+            self._thread = threading.Thread(target=self._run, name='matrica-rss', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._done.wait(RSS_SAMPLE_INTERVAL):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def stop(self):
+        if self._thread is not None:
+            self._done.set()
+            self._thread.join()
+            self._sample()
+        return self.peak
+
+
+class StageRecorder:
+    """
+    Collects one record per finished stage: wall_s, cpu_s (process CPU
+    time, so including other threads), peak_rss_mb (highest process RSS
+    sampled during the stage, so it includes jobs running in other threads;
+    None without /proc) and, with trace_memory, py_peak_mb - the
+    tracemalloc peak of Python allocations during the stage. tracemalloc
+    slows allocation-heavy code noticeably and is process wide, so it is
+    off by default. Work done in child processes is only seen as wall time.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._token = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._token = _recorder.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _recorder.reset(self._token)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+def stage_totals(stages):
+    """Summed wall/CPU time and the highest memory figures over stage records."""
+    def peak(field):
+        return max((record[field] for record in stages if record[field] is not None), default=None)
+
+    return {
+        'stage': "ukupno",
+        'wall_s': sum(record['wall_s'] for record in stages),
+        'cpu_s': sum(record['cpu_s'] for record in stages),
+        'peak_rss_mb': peak('peak_rss_mb'),
+        'py_peak_mb': peak('py_peak_mb'),
+    }
+
+
+def recorded_stages():
+    """Stages recorded so far by the active StageRecorder (empty without one)."""
+    recorder = _recorder.get()
+    return list(recorder.stages) if recorder is not None else []
+
+
+@contextmanager
+def stage(name):
+    """Record the enclosed block as stage `name` of the active StageRecorder."""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+
+    tracing = recorder.trace_memory and tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    rss = _RssSampler()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield
+    finally:
+        recorder.stages.append({
+            'stage': name,
+            'wall_s': time.perf_counter() - wall,
+            'cpu_s': time.process_time() - cpu,
+            'peak_rss_mb': rss.stop(),
+            'py_peak_mb': tracemalloc.get_traced_memory()[1] / 1024 / 1024 if tracing else None,
+        })
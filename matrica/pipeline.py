@@ -0,0 +1,145 @@
+"""Load -> process -> export steps shared by the Streamlit app and the CLI."""
+import os
+
+from . import loaders
+from .export import generate_excel_streaming
+from .formats import FILE_TYPES, SPARSE_FORMATS, export_matrix, export_pairs, export_sparse
+from .metrics import StageRecorder, recorded_stages, stage
+from .processing import process_data, process_pairs, top_n
+
+# Output format name -> (what is exported, file format)
+OUTPUT_FORMATS = {
+    'xlsx': ('matrix', 'xlsx'),
+    'parquet': ('matrix', 'parquet'),
+    'feather': ('matrix', 'feather'),
+    'pairs-csv': ('pairs', 'csv'),
+    'pairs-parquet': ('pairs', 'parquet'),
+    'pairs-xlsx': ('pairs', 'xlsx'),
+}
+for _fmt in SPARSE_FORMATS:
+    OUTPUT_FORMATS[_fmt] = ('sparse', _fmt)
+
+
+def load(file, kupac_col, artikl_col, engine=None, streaming=False, cache=None, file_hash=None):
+    """
+    Read the kupac/artikl columns and reduce them with process_data.
+
+    A ParseCache hit is used whenever one is given; otherwise streaming
+    feeds rows straight into process_pairs (not possible for xls).
+    file_hash (file_sha256 of file) saves re-hashing it for the cache key.
+    Returns (data, info) where info['source'] is 'cache', 'streaming' or
+    'parse' and info['memory_mb'] is the parsed frame size, if one existed.
+    """
+    df = None
+    if cache is not None:
+        cache_key = cache.key(file, kupac_col, artikl_col, file_hash, engine)
+        with stage('cache'):
+            df = cache.get(cache_key, [kupac_col, artikl_col])
+
+    if df is None and streaming and loaders.file_extension(file) != '.xls':
+        data = process_pairs(loaders.iter_pairs(file, kupac_col, artikl_col))
+        return data, {'source': 'streaming', 'memory_mb': None}
+
+    source = 'cache' if df is not None else 'parse'
+    if df is None:
+        with stage('parse'):
+            df = loaders.load_data(file, kupac_col, artikl_col, engine)
+        if cache is not None:
+            with stage('cache'):
+                cache.put(cache_key, df)
+
+    info = {'source': source, 'memory_mb': df.memory_usage(deep=True).sum() / 1024 / 1024}
+    return process_data(df, kupac_col, artikl_col), info
+
+
+def export(data, kupac_col, artikl_col, output_format='xlsx', backend='xml', workers=None,
+           with_counts=False, progress_callback=None, metrics_in_summary=False):
+    """
+    Write data in one of OUTPUT_FORMATS.
+    metrics_in_summary adds the stages recorded so far (see metrics) to
+    the Summary sheet of an xlsx matrix.
+    Returns (output, top_kupci, top_artikli); output is a rewound spooled
+    temp file the caller should close.
+    """
+    try:
+        kind, fmt = OUTPUT_FORMATS[output_format]
+    except KeyError:
+        raise ValueError(f"Nepoznat format izvoza: {output_format}") from None
+
+    if kind == 'matrix' and fmt == 'xlsx':
+        return generate_excel_streaming(
+            data, kupac_col, artikl_col, data['num_rows'], progress_callback, backend, workers,
+            recorded_stages() if metrics_in_summary else None,
+        )
+
+    with stage('write'):
+        if kind == 'matrix':
+            output = export_matrix(data, kupac_col, fmt)
+        elif kind == 'sparse':
+            output = export_sparse(data, kupac_col, artikl_col, fmt, with_counts)
+        else:
+            output = export_pairs(data, kupac_col, artikl_col, fmt, with_counts)
+    with stage('summary'):
+        top_kupci = top_n(data['kupci'], data['kupac_counts'])
+        top_artikli = top_n(data['artikli'], data['artikl_counts'])
+    return output, top_kupci, top_artikli
+
+
+def run(file, kupac_col, artikl_col, output_format='xlsx', engine=None, streaming=False,
+        cache=None, file_hash=None, backend='xml', workers=None, with_counts=False,
+        progress_callback=None, trace_memory=False, metrics_in_summary=False):
+    """
+    load followed by export, reporting progress_callback(pct, text) per
+    stage. Returns a dict with the output file (rewound; the caller closes
+    it), the load info, top lists, the num_rows / num_kupaca /
+    num_artikala / true_count totals and the per-stage metrics ('stages',
+    see metrics.StageRecorder; trace_memory adds tracemalloc peaks).
+    """
+    def report(pct, text):
+        if progress_callback:
+            progress_callback(pct, text)
+
+    with StageRecorder(trace_memory) as recorder:
+        report(0, "Učitavam odabrane stupce...")
+        data, info = load(file, kupac_col, artikl_col, engine, streaming, cache, file_hash)
+
+        report(20, f"Generiram {output_format} ({data['num_kupaca']:,} kupaca)...")
+        output, top_kupci, top_artikli = export(
+            data, kupac_col, artikl_col, output_format, backend, workers, with_counts,
+            lambda pct: report(pct, f"Zapisujem matricu... {pct}%"), metrics_in_summary,
+        )
+        report(100, "Gotovo!")
+
+    result = {key: data[key] for key in ('num_rows', 'num_kupaca', 'num_artikala', 'true_count')}
+    result.update(
+        output=output, load_info=info, top_kupci=top_kupci, top_artikli=top_artikli,
+        stages=recorder.stages,
+    )
+    return result
+
+
+def output_file_info(output_format):
+    """(default file name, mime type) for an output format."""
+    kind, fmt = OUTPUT_FORMATS[output_format]
+    mime, extension = FILE_TYPES[fmt]
+    return f"kupac_artikl_{kind}{extension}", mime
+
+
+def default_output_path(input_path, output_format, output_dir=None):
+    """<input stem>_<kind><ext>, next to the input unless output_dir is given."""
+    file_name, _ = output_file_info(output_format)
+    kind, extension = os.path.splitext(file_name)
+    stem = os.path.splitext(os.path.basename(input_path) if output_dir else input_path)[0]
+    if output_dir:
+        stem = os.path.join(output_dir, stem)
+    return f"{stem}_{kind.rsplit('_', 1)[-1]}{extension}"
+
+
+def resolve_column(columns, name):
+    """Match a column name given as text against the file header."""
+    if name in columns:
+        return name
+    for column in columns:
+        if str(column) == name:
+            return column
+    raise ValueError(f"Stupac {name!r} ne postoji. Dostupni stupci: {', '.join(map(str, columns))}")
@@ -0,0 +1,175 @@
+"""Reduction of purchase rows to unique kupac/artikl pairs."""
+import numpy as np
+import pandas as pd
+
+from .metrics import stage
+
+
+def process_data(df, kupac_col, artikl_col):
+    """
+    Factorize kupac/artikl into sorted int32 codes and dedupe pairs as
+    int64 keys - minimal memory footprint.
+    Expects the two-column string frame produced by load_excel.
+    Returns only what's needed for stats and Excel generation.
+    """
+    # Drop rows with NaN in key columns
+    with stage('clean'):
+        df_clean = df.dropna()
+
+    return _summarize(df_clean[kupac_col], df_clean[artikl_col], len(df))
+
+
+def process_pairs(pairs):
+    """
+    Same result as process_data, built from an iterable of (kupac, artikl)
+    rows such as loaders.iter_excel_pairs. Rows with a missing value are
+    counted but skipped, so memory grows with unique pairs, not source rows.
+    """
+    pair_counts = {}
+    num_rows = 0
+    # Reading happens as pairs is consumed, so parsing and per-pair counting
+    # are one stage here
+    with stage('parse'):
+        for kupac, artikl in pairs:
+            num_rows += 1
+            if kupac is not None and artikl is not None:
+                pair_counts[kupac, artikl] = pair_counts.get((kupac, artikl), 0) + 1
+
+    kupac_values, artikl_values = zip(*pair_counts) if pair_counts else ((), ())
+    return _summarize(
+        np.array(kupac_values, dtype=object),
+        np.array(artikl_values, dtype=object),
+        num_rows,
+        weights=np.fromiter(pair_counts.values(), dtype=np.int64, count=len(pair_counts)),
+    )
+
+
+class PairMatrix:
+    """
+    Kupac × artikl relation in CSR form. Row i (a kupac code) holds the
+    sorted artikl codes indices[indptr[i]:indptr[i + 1]]; every stored
+    entry is a True cell. counts, when known, holds the number of source
+    rows behind each stored entry.
+    """
+
+    def __init__(self, indptr, indices, shape, counts=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.shape = shape
+        self.counts = counts
+
+    @classmethod
+    def from_keys(cls, keys, num_kupaca, num_artikala, counts=None):
+        """Build from sorted unique kupac * num_artikala + artikl keys."""
+        width = max(num_artikala, 1)
+        row_codes = keys // width
+        indptr = np.zeros(num_kupaca + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_codes, minlength=num_kupaca), out=indptr[1:])
+        indices = (keys % width).astype(np.int32)
+        return cls(indptr, indices, (num_kupaca, num_artikala), counts)
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    @property
+    def row_degrees(self):
+        """Number of artikli per kupac."""
+        return np.diff(self.indptr)
+
+    @property
+    def col_degrees(self):
+        """Number of kupci per artikl."""
+        return np.bincount(self.indices, minlength=self.shape[1])
+
+    def row(self, i):
+        """Sorted artikl codes bought by kupac i."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def to_scipy(self, with_counts=False):
+        """
+        scipy.sparse.csr_matrix sharing indptr/indices; values are 1 (int8)
+        or, with_counts, the number of source rows per pair.
+        """
+        from scipy.sparse import csr_matrix
+
+        if with_counts:
+            values = self.counts
+        else:
+            values = np.ones(self.nnz, dtype=np.int8)
+        return csr_matrix((values, self.indices, self.indptr), shape=self.shape)
+
+    def row_codes(self):
+        """Kupac code of every stored entry (the COO row array)."""
+        return np.repeat(np.arange(self.shape[0], dtype=np.int32), self.row_degrees)
+
+
+def _summarize(kupac_values, artikl_values, num_rows, weights=None):
+    # Dense codes in sorted label order, so code order == output order
+    with stage('factorize'):
+        kupac_codes, kupci = _sorted_codes(kupac_values)
+        artikl_codes, artikli = _sorted_codes(artikl_values)
+    num_kupaca = len(kupci)
+    num_artikala = len(artikli)
+
+    # One int64 key per pair; sorted unique keys order pairs by kupac, then artikl
+    with stage('dedupe'):
+        keys, counts = _sorted_unique(kupac_codes.astype(np.int64) * num_artikala + artikl_codes, weights)
+
+    with stage('count'):
+        matrix = PairMatrix.from_keys(keys, num_kupaca, num_artikala, counts.astype(np.int32))
+        return {
+            'matrix': matrix,
+            'kupci': list(kupci),
+            'artikli': list(artikli),
+            'kupac_counts': matrix.row_degrees,
+            'artikl_counts': matrix.col_degrees,
+            'num_rows': num_rows,
+            'num_kupaca': num_kupaca,
+            'num_artikala': num_artikala,
+            'true_count': matrix.nnz
+        }
+
+
+def _sorted_codes(values):
+    """
+    int32 codes of values and the unique labels in sorted label order.
+    factorize(sort=True) orders a categorical by its categories, which need
+    not be sorted (e.g. after union_categoricals), so sort those first.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        if not categories.is_monotonic_increasing:
+            values = values.cat.reorder_categories(categories.sort_values())
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype(np.int32, copy=False), uniques
+
+
+def _sorted_unique(keys, weights=None):
+    """
+    Sorted unique keys and how often each occurs (summing weights if given).
+    Equivalent to np.unique(return_counts=True), but a plain sort +
+    neighbour mask is several times faster on large int64 arrays.
+    """
+    if weights is None:
+        keys = np.sort(keys)
+    else:
+        order = np.argsort(keys, kind='stable')
+        keys, weights = keys[order], weights[order]
+    if len(keys) == 0:
+        return keys, np.zeros(0, dtype=np.int64)
+    mask = np.empty(len(keys), dtype=bool)
+    mask[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=mask[1:])
+    starts = np.flatnonzero(mask)
+    if weights is None:
+        counts = np.diff(np.append(starts, len(keys)))
+    else:
+        counts = np.add.reduceat(weights, starts)
+    return keys[starts], counts
+
+
+def top_n(labels, counts, n=10):
+    """(label, count) pairs with the highest counts, ties in label order."""
+    order = np.argsort(-counts, kind='stable')[:n]
+    return [(labels[i], int(counts[i])) for i in order]
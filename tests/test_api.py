@@ -0,0 +1,70 @@
+import http.client
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from matrica.api import ApiServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = ApiServer(('127.0.0.1', 0), workers=1, work_dir=str(tmp_path / 'work'))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=30)
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    payload = response.read()
+    conn.close()
+    return response.status, payload
+
+
+def test_job_round_trip(server, tmp_path):
+    path = tmp_path / 'log.csv'
+    pd.DataFrame({'Kupac': ['K1', 'K2', 'K1'], 'Artikl': ['A1', 'A1', 'A2']}).to_csv(path, index=False)
+
+    status, body = request(server, 'POST', '/jobs?kupac=Kupac&artikl=Artikl&filename=log.csv&format=pairs-csv',
+                           path.read_bytes())
+    assert status == 202
+    job_id = json.loads(body)['id']
+
+    deadline = time.time() + 30
+    while json.loads(request(server, 'GET', f'/jobs/{job_id}')[1])['status'] not in ('done', 'failed'):
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+    status, body = request(server, 'GET', f'/jobs/{job_id}/result')
+    assert status == 200
+    assert body.decode().splitlines()[1:] == ['"K1","A1"', '"K1","A2"', '"K2","A1"']
+
+
+def test_negative_content_length_is_rejected(server):
+    status, body = request(server, 'POST', '/jobs?kupac=Kupac&artikl=Artikl&filename=log.csv',
+                           headers={'Content-Length': '-5'})
+
+    assert status == 400
+    assert os.listdir(server.work_dir) == []
+
+
+def test_short_body_leaves_no_upload(server):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=30)
+    conn.putrequest('POST', '/jobs?kupac=Kupac&artikl=Artikl&filename=log.csv')
+    conn.putheader('Content-Length', '100')
+    conn.endheaders()
+    conn.send(b'Kupac,Artikl\n')
+    conn.sock.shutdown(1)  # no more data from the client
+    response = conn.getresponse()
+    conn.close()
+
+    assert response.status == 400
+    assert os.listdir(server.work_dir) == []
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from matrica import loaders, pipeline
+from matrica.cache import ParseCache
+
+
+def test_numeric_labels_survive_a_cache_hit(tmp_path):
+    path = tmp_path / 'log.xlsx'
+    pd.DataFrame({2023: ['K1', 'K1', 'K2'], 2024: ['A1', 'A2', 'A1']}).to_excel(path, index=False)
+    cache = ParseCache(str(tmp_path / 'cache'))
+    kupac_col, artikl_col = loaders.load_preview(str(path), 'openpyxl').columns
+
+    parsed, info = pipeline.load(str(path), kupac_col, artikl_col, 'openpyxl', cache=cache)
+    assert info['source'] == 'parse'
+    cached, info = pipeline.load(str(path), kupac_col, artikl_col, 'openpyxl', cache=cache)
+    assert info['source'] == 'cache'
+
+    assert cached['kupci'] == parsed['kupci'] == ['K1', 'K2']
+    assert cached['artikli'] == parsed['artikli'] == ['A1', 'A2']
+
+
+def test_key_depends_on_excel_engine(tmp_path):
+    path = tmp_path / 'log.xlsx'
+    pd.DataFrame({'Kupac': ['K1'], 'Artikl': ['A1']}).to_excel(path, index=False)
+    cache = ParseCache(str(tmp_path / 'cache'))
+
+    assert cache.key(str(path), 'Kupac', 'Artikl', engine='openpyxl') != \
+        cache.key(str(path), 'Kupac', 'Artikl', engine='calamine')
@@ -0,0 +1,146 @@
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from matrica import export, process_data
+from matrica.metrics import peak_rss_mb
+
+
+def make_data(rows=3000, num_kupaca=120, num_artikala=60, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Kupac': [f"K{i:04d}" for i in rng.integers(0, num_kupaca, rows)],
+        'Artikl': [f"A{i:04d}" for i in rng.integers(0, num_artikala, rows)],
+    })
+    return process_data(df, 'Kupac', 'Artikl'), len(df)
+
+
+def sheet_values(output):
+    """
+    {sheet name: list of row tuples} of an xlsx file object. Trailing empty
+    cells are dropped: read-only openpyxl pads rows to the sheet dimension,
+    which xlsxwriter records wider than the other backends.
+    """
+    def trim(row):
+        row = list(row)
+        while row and row[-1] is None:
+            row.pop()
+        return tuple(row)
+
+    wb = load_workbook(output, read_only=True)
+    try:
+        return {
+            ws.title: [trim(row) for row in ws.iter_rows(values_only=True)]
+            for ws in wb.worksheets
+        }
+    finally:
+        wb.close()
+
+
+def generate(data, df_len, kupac_col='Kupac', **kwargs):
+    output, _, _ = export.generate_excel_streaming(data, kupac_col, 'Artikl', df_len, **kwargs)
+    with output:
+        assert zipfile.ZipFile(output).testzip() is None
+        return sheet_values(output)
+
+
+@pytest.fixture
+def small_tiles(monkeypatch):
+    # 120 kupci x 60 artikli -> 4 row blocks x 3 column blocks
+    monkeypatch.setattr(export, 'MAX_EXCEL_ROWS', 31)
+    monkeypatch.setattr(export, 'MAX_EXCEL_COLS', 21)
+
+
+@pytest.mark.usefixtures('small_tiles')
+def test_parallel_tiles_match_single_process():
+    data, df_len = make_data()
+
+    serial = generate(data, df_len, workers=1)
+    parallel = generate(data, df_len, workers=2)
+
+    assert list(parallel) == ['Summary'] + [f"Matrica_{i}" for i in range(1, 13)]
+    assert parallel == serial
+
+
+def test_single_sheet_skips_process_pool(monkeypatch):
+    data, df_len = make_data()
+    serial = generate(data, df_len, workers=1)
+
+    def no_pool(*args):
+        raise AssertionError("process pool started for a single Matrica sheet")
+
+    monkeypatch.setattr(export, '_write_tiles_parallel', no_pool)
+    assert generate(data, df_len, workers=4) == serial
+
+
+@pytest.mark.usefixtures('small_tiles')
+def test_parallel_tiles_zip64_headers(monkeypatch):
+    # A real member over 4 GiB is too slow for a test; lowering the limit
+    # takes the zip64 branch of _add_deflated_entry for every Matrica part
+    data, df_len = make_data()
+    serial = generate(data, df_len, workers=1)
+    monkeypatch.setattr(zipfile, 'ZIP64_LIMIT', 16)
+
+    assert generate(data, df_len, workers=2) == serial
+
+
+@pytest.mark.parametrize('backend', [backend for backend in export.BACKENDS if backend != 'xml'])
+@pytest.mark.parametrize('tiled', [False, True], ids=['single', 'tiled'])
+@pytest.mark.parametrize('kupac_col', ['Kupac', 2023])
+def test_backends_write_the_same_cells(request, backend, tiled, kupac_col):
+    if tiled:
+        request.getfixturevalue('small_tiles')
+    data, df_len = make_data()
+
+    expected = generate(data, df_len, kupac_col, backend='xml')
+    values = generate(data, df_len, kupac_col, backend=backend)
+
+    assert list(values) == list(expected)
+    for name, rows in expected.items():
+        assert values[name] == rows, name
+        if name.startswith('Matrica'):
+            assert rows[0][0] == kupac_col
+
+
+@pytest.mark.skipif(peak_rss_mb() is None, reason="peak RSS not available on this platform")
+@pytest.mark.parametrize('backend', export.BACKENDS)
+def test_peak_rss_does_not_grow_with_kupci(backend):
+    # Each size is exported in a fresh process (as in bench_export.py); a
+    # workbook holding every cell would grow by ~100 MB for the larger one
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'benchmarks'))
+    from bench_export import _run
+    from common import run_isolated
+
+    _, small, _ = run_isolated(_run, backend, 500, 100, 5)
+    _, large, _ = run_isolated(_run, backend, 5000, 100, 5)
+
+    assert large < small + 16, f"{small:.1f} MB -> {large:.1f} MB"
+
+
+def test_deflated_entry_is_the_only_change(tmp_path):
+    # Appending to an existing zip without any other write: close() must
+    # still rewrite the central directory
+    payload = b"<row/>" * 1000
+    part = tmp_path / 'part.deflate'
+    with open(part, 'wb') as fh:
+        writer = export._DeflateWriter(fh)
+        writer.write(payload)
+        writer.finish()
+
+    path = tmp_path / 'out.zip'
+    with zipfile.ZipFile(path, 'w') as dst:
+        dst.writestr('first.txt', "prvi")
+    with zipfile.ZipFile(path, 'a') as dst:
+        export._add_deflated_entry(
+            dst, 'part.xml', str(part), writer.crc, writer.file_size, writer.compress_size,
+        )
+
+    with zipfile.ZipFile(path) as src:
+        assert src.testzip() is None
+        assert src.namelist() == ['first.txt', 'part.xml']
+        assert src.read('part.xml') == payload
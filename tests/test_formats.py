@@ -0,0 +1,59 @@
+import os
+import sys
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from matrica import formats
+from matrica.metrics import peak_rss_mb
+from test_export import make_data
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'benchmarks'))
+
+
+def dense(data):
+    matrix = data['matrix']
+    grid = np.zeros((data['num_kupaca'], data['num_artikala']), dtype=bool)
+    grid[matrix.row_codes(), matrix.indices] = True
+    return grid
+
+
+def test_parquet_row_groups_match_matrix(monkeypatch):
+    # 120 kupci in row groups of 51: none a multiple of 8 bits
+    monkeypatch.setattr(formats, 'ROW_GROUP_CELLS', 51 * 60)
+    data, _ = make_data()
+
+    with formats.export_matrix(data, 'Kupac', 'parquet') as output:
+        parquet = pq.ParquetFile(output)
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+
+    assert table.column('Kupac').to_pylist() == data['kupci']
+    grid = np.column_stack([table.column(artikl).to_numpy() for artikl in data['artikli']])
+    np.testing.assert_array_equal(grid, dense(data))
+
+    with formats.export_matrix(data, 'Kupac', 'feather') as output:
+        assert pa.ipc.open_file(output).read_all().equals(table)
+
+
+def _export_parquet(num_kupaca, num_artikala):
+    from bench_export import make_data as make_bench_data
+
+    data = make_bench_data(num_kupaca, num_artikala, 30)
+    base = peak_rss_mb()
+    formats.export_matrix(data, 'Kupac', 'parquet').close()
+    return peak_rss_mb() - base
+
+
+@pytest.mark.skipif(peak_rss_mb() is None, reason="peak RSS not available on this platform")
+def test_parquet_peak_rss_does_not_grow_with_kupci():
+    # One row group per dense build batch (~800 kupci at 20k artikli) grew
+    # by ~40 MB of writer metadata per row group
+    from common import run_isolated
+
+    small = run_isolated(_export_parquet, 1000, 20_000)
+    large = run_isolated(_export_parquet, 6000, 20_000)
+
+    assert large < small + 32, f"{small:.1f} MB -> {large:.1f} MB"
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from matrica import loaders, pipeline
+
+# xlrd only reads xls
+XLSX_ENGINES = [engine for engine in loaders.available_engines() if engine != 'xlrd']
+
+
+def write_xlsx(path, header, rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+@pytest.mark.parametrize('engine', XLSX_ENGINES)
+def test_numeric_headers_are_labels_not_positions(tmp_path, engine):
+    path = tmp_path / 'log.xlsx'
+    write_xlsx(path, ['Datum', 1, 'X', 2], [['2024-01-01', 'K1', 'x', 'A1'], ['2024-01-02', 'K2', 'y', 'A2']])
+    columns = loaders.load_preview(str(path), engine).columns
+    kupac_col, artikl_col = columns[1], columns[3]
+
+    df = loaders.load_excel(str(path), kupac_col, artikl_col, engine)
+
+    assert list(df.columns) == [kupac_col, artikl_col]
+    assert df[kupac_col].tolist() == ['K1', 'K2']
+    assert df[artikl_col].tolist() == ['A1', 'A2']
+
+
+@pytest.mark.parametrize('engine', XLSX_ENGINES)
+def test_year_headers(tmp_path, engine):
+    path = tmp_path / 'log.xlsx'
+    write_xlsx(path, [2023, 2024], [['K1', 'A1'], ['K2', 'A2']])
+    kupac_col, artikl_col = loaders.load_preview(str(path), engine).columns
+
+    df = loaders.load_excel(str(path), kupac_col, artikl_col, engine)
+
+    assert df[kupac_col].tolist() == ['K1', 'K2']
+    assert df[artikl_col].tolist() == ['A1', 'A2']
+
+
+@pytest.mark.parametrize('output_format', ['pairs-csv', 'pairs-parquet', 'pairs-xlsx'])
+def test_year_headers_pairs_export(tmp_path, output_format):
+    path = tmp_path / 'log.xlsx'
+    write_xlsx(path, [2023, 2024], [['K1', 'A1'], ['K2', 'A2'], ['K1', 'A2']])
+    kupac_col, artikl_col = loaders.load_preview(str(path)).columns
+
+    result = pipeline.run(str(path), kupac_col, artikl_col, output_format)
+    with result['output'] as output:
+        if output_format == 'pairs-xlsx':
+            df = pd.read_excel(output, dtype=str)
+        elif output_format == 'pairs-parquet':
+            df = pd.read_parquet(output).astype(str)
+        else:
+            df = pd.read_csv(output, dtype=str)
+
+    assert [str(column) for column in df.columns] == ['2023', '2024']
+    assert df.values.tolist() == [['K1', 'A1'], ['K1', 'A2'], ['K2', 'A2']]
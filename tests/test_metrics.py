@@ -0,0 +1,20 @@
+import time
+
+import numpy as np
+import pytest
+
+from matrica.metrics import RSS_SAMPLE_INTERVAL, StageRecorder, current_rss_mb, stage
+
+
+@pytest.mark.skipif(current_rss_mb() is None, reason="current RSS not available on this platform")
+def test_peak_rss_is_per_stage():
+    with StageRecorder() as recorder:
+        with stage('big'):
+            block = np.ones(200 * 1024 * 1024, dtype=np.uint8)
+            time.sleep(5 * RSS_SAMPLE_INTERVAL)
+            del block
+        with stage('small'):
+            pass
+
+    big, small = (record['peak_rss_mb'] for record in recorder.stages)
+    assert small < big - 150
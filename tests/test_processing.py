@@ -0,0 +1,73 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from matrica import loaders, pipeline, process_data
+
+
+def write_log(path, rows=5000, seed=0):
+    # Labels deliberately not in sorted order of first appearance
+    rng = np.random.default_rng(seed)
+    kupci = [f"K{i:04d}" for i in rng.permutation(300)]
+    artikli = [f"A{i:04d}" for i in rng.permutation(200)]
+    pd.DataFrame({
+        'Kupac': [kupci[i] for i in rng.integers(0, len(kupci), rows)],
+        'Artikl': [artikli[i] for i in rng.integers(0, len(artikli), rows)],
+    }).to_csv(path, index=False)
+
+
+def test_csv_blocks_give_sorted_labels(tmp_path, monkeypatch):
+    path = tmp_path / 'log.csv'
+    write_log(path)
+    monkeypatch.setattr(loaders, 'CSV_BLOCK_SIZE', 4096)
+
+    data, _ = pipeline.load(str(path), 'Kupac', 'Artikl')
+    streamed, _ = pipeline.load(str(path), 'Kupac', 'Artikl', streaming=True)
+
+    assert data['kupci'] == sorted(data['kupci'])
+    assert data['artikli'] == sorted(data['artikli'])
+    assert data['kupci'] == streamed['kupci']
+    assert data['artikli'] == streamed['artikli']
+    np.testing.assert_array_equal(data['matrix'].indptr, streamed['matrix'].indptr)
+    np.testing.assert_array_equal(data['matrix'].indices, streamed['matrix'].indices)
+
+
+@pytest.mark.parametrize('engine', [engine for engine in loaders.available_engines() if engine != 'xlrd'])
+def test_xlsx_streaming_gives_same_labels(tmp_path, engine):
+    path = tmp_path / 'log.xlsx'
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['Kupac', 'Artikl'])
+    for row in [
+        ['NA', 'A1'], ['NULL', 'A1'], ['N/A', 'A2'], ['K1', 'null'], ['K1', 'A1'],
+        [1.0, True], [True, 'A2'], [2.0, 1], [False, False], [0, 'A3'], [' NA', 2.5],
+        ['K2', datetime.datetime(2024, 1, 2)], [None, 'A1'], ['K3', ''],
+    ]:
+        ws.append(row)
+    wb.save(path)
+
+    data, _ = pipeline.load(str(path), 'Kupac', 'Artikl', engine)
+    streamed, _ = pipeline.load(str(path), 'Kupac', 'Artikl', streaming=True)
+
+    assert streamed['kupci'] == data['kupci']
+    assert streamed['artikli'] == data['artikli']
+    assert 'NA' not in data['kupci'] and 'null' not in data['artikli']
+    np.testing.assert_array_equal(data['matrix'].indptr, streamed['matrix'].indptr)
+    np.testing.assert_array_equal(data['matrix'].indices, streamed['matrix'].indices)
+
+
+def test_unsorted_categories_are_sorted():
+    df = pd.DataFrame({
+        'Kupac': pd.Categorical(['b', 'a', 'c', 'a'], categories=['c', 'b', 'a']),
+        'Artikl': pd.Categorical(['y', 'x', 'x', 'y'], categories=['y', 'x']),
+    })
+    data = process_data(df, 'Kupac', 'Artikl')
+
+    assert data['kupci'] == ['a', 'b', 'c']
+    assert data['artikli'] == ['x', 'y']
+    # a: x, y   b: y   c: x
+    assert data['matrix'].indptr.tolist() == [0, 2, 3, 4]
+    assert data['matrix'].indices.tolist() == [0, 1, 1, 0]